@@ -0,0 +1,45 @@
+'''
+Compares the NumPy fast paths of statistics.average with the element by
+element code on arrays of publication-count-like values.
+
+usage: python bench/bench_average.py [repeats]
+'''
+from os import path
+import sys
+import timeit
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from comp61542.statistics import average
+
+SIZES = [100, 1000, 10000, 100000, 1000000]
+
+def best_time(func, X, repeats):
+    return min(timeit.repeat(lambda: func(X), number=1, repeat=repeats))
+
+def main(argv):
+    repeats = 3
+    if len(argv) > 1:
+        repeats = int(argv[1])
+
+    rng = np.random.RandomState(61542)
+    print "%-7s %9s %12s %12s %9s" % ("func", "size", "loop (s)", "numpy (s)", "speedup")
+    for func in [average.mean, average.median, average.mode]:
+        for n in SIZES:
+            # skewed small counts, stored as floats like Database's matrices
+            X = rng.zipf(2.0, n).clip(0, 500).astype(float)
+            average.FAST_PATHS = False
+            slow = best_time(func, X, repeats)
+            expected = func(X)
+            average.FAST_PATHS = True
+            fast = best_time(func, X, repeats)
+            if repr(func(X)) != repr(expected):
+                print "ERROR: %s results differ for size %d" % (func.__name__, n)
+                return 1
+            print "%-7s %9d %12.6f %12.6f %8.1fx" % (func.__name__, n, slow, fast,
+                slow / max(fast, 1e-9))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
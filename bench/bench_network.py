@@ -0,0 +1,73 @@
+'''
+Compares Database.get_network_data with the original implementation, which
+called _get_collaborations once per author and scanned every publication
+each time.
+
+usage: python bench/bench_network.py [data file] [repeats]
+'''
+from os import path
+import sys
+import time
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+from comp61542.database import database
+
+def network_data_per_author(db):
+    na = len(db.authors)
+
+    nodes = [ [db.authors[i].name, -1] for i in range(na) ]
+    links = set()
+    for a in range(na):
+        collab = {}
+        for p in db.publications:
+            if a in p.authors:
+                for a2 in p.authors:
+                    collab[a2] = collab.get(a2, 0) + 1
+        del collab[a]
+        nodes[a][1] = len(collab)
+        for a2 in collab:
+            if a < a2:
+                links.add((a, a2))
+    return (nodes, links)
+
+def best_time(func, repeats):
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def main(argv):
+    data_dir = path.join(path.dirname(path.abspath(__file__)), "..", "data")
+    data_file = path.join(data_dir, "dblp_curated_sample.xml")
+    if len(argv) > 1:
+        data_file = argv[1]
+    repeats = 3
+    if len(argv) > 2:
+        repeats = int(argv[2])
+
+    # without the result cache, so that every repeat computes the network
+    db = database.Database(cache_bytes=0)
+    if db.read(data_file) == False:
+        return 1
+    print "%s: %d publications, %d authors" % (path.basename(data_file),
+        len(db.publications), len(db.authors))
+
+    old_time, old_result = best_time(lambda: network_data_per_author(db), repeats)
+    new_time, new_result = best_time(db.get_network_data, repeats)
+    if old_result != new_result:
+        print "ERROR: results differ"
+        return 1
+
+    print "per-author scans: %8.4fs" % old_time
+    print "single pass:      %8.4fs" % new_time
+    print "speedup:          %8.1fx" % (old_time / max(new_time, 1e-9))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,47 @@
+'''
+Measures Database.read throughput, in records per second, with the expat
+ingestion path and with the xml.sax fallback.
+
+usage: python bench/bench_parse.py [data file] [repeats]
+'''
+from os import path
+import sys
+import time
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+from comp61542.database import database
+
+def time_read(data_file, use_sax, repeats):
+    best = None
+    records = 0
+    for _ in range(repeats):
+        db = database.Database()
+        start = time.time()
+        if db.read(data_file, use_sax=use_sax) == False:
+            return None, 0
+        elapsed = time.time() - start
+        records = len(db.publications)
+        if best == None or elapsed < best:
+            best = elapsed
+    return best, records
+
+def main(argv):
+    data_dir = path.join(path.dirname(path.abspath(__file__)), "..", "data")
+    data_file = path.join(data_dir, "dblp_curated_sample.xml")
+    if len(argv) > 1:
+        data_file = argv[1]
+    repeats = 5
+    if len(argv) > 2:
+        repeats = int(argv[2])
+
+    print "%s (best of %d)" % (path.basename(data_file), repeats)
+    for label, use_sax in [("sax", True), ("expat", False)]:
+        elapsed, records = time_read(data_file, use_sax, repeats)
+        if elapsed == None:
+            return 1
+        print "%-6s %8.4fs %10.0f records/s" % (label, elapsed, records / max(elapsed, 1e-9))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
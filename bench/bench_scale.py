@@ -0,0 +1,167 @@
+'''
+Times Database.read and every public get_* query on synthetic DBLP files
+of increasing size (see generate_dblp.py) and writes the timings and peak
+memory of each size to a JSON file, so that runs can be compared.
+
+Each size is measured in a fresh process, so the peak RSS reported for it
+is its own. Queries run with the result cache disabled. Generated files
+are kept in the work directory and reused by later runs.
+
+usage: python bench/bench_scale.py [sizes] [out file] [work dir]
+
+sizes is a comma separated list of record counts, by default
+10000,100000,1000000,5000000. The results go to bench_scale.json.
+'''
+import inspect
+import json
+from os import path
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+from comp61542.database import database
+import generate_dblp
+
+SIZES = [10000, 100000, 1000000, 5000000]
+
+def peak_rss():
+    # ru_maxrss is in kilobytes on Linux and in bytes on OS X
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return rss
+    return rss * 1024
+
+def queries(db):
+    '''
+    return: (calls, skipped) where calls lists (label, method, args) for
+        every public get_* method and skipped the methods whose arguments
+        are unknown. Methods taking a statistic are called with each one.
+    '''
+    pubs = [ len(p) for p in db.author_pubs ]
+    author = db.authors[pubs.index(max(pubs))].name
+    known = {"start_year":[db.min_year], "end_year":[db.max_year],
+             "pub_type":[4], "author_name":[author], "name":[author],
+             "author":[author], "k":[20],
+             "av":[database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE]}
+
+    calls = []
+    skipped = []
+    for name, func in sorted(vars(database.Database).items()):
+        if not name.startswith("get_") or not callable(func):
+            continue
+        spec = inspect.getargspec(getattr(func, "__wrapped__", func))
+        required = spec.args[1:len(spec.args) - len(spec.defaults or ())]
+        if any(arg not in known for arg in required):
+            skipped.append(name)
+            continue
+        if "av" in required:
+            for av in known["av"]:
+                args = [ known[arg][av] if arg == "av" else known[arg][0] for arg in required ]
+                calls.append(("%s(%s)" % (name, database.Stat.STR[av]), name, args))
+        else:
+            calls.append((name, name, [ known[arg][0] for arg in required ]))
+    return calls, skipped
+
+def measure(data_file):
+    db = database.Database(cache_bytes=0)
+    start = time.time()
+    if db.read(data_file) == False:
+        return None
+    result = {"read_seconds":time.time() - start,
+              "publications":len(db.publications), "authors":len(db.authors),
+              "rss_after_read_bytes":peak_rss()}
+
+    calls, skipped = queries(db)
+    timings = {}
+    for label, name, args in calls:
+        start = time.time()
+        getattr(db, name)(*args)
+        timings[label] = time.time() - start
+    result["query_seconds"] = timings
+    result["skipped"] = skipped
+    result["peak_rss_bytes"] = peak_rss()
+    return result
+
+def run_size(records, work_dir):
+    data_file = path.join(work_dir, "synthetic-%d.xml" % records)
+    if not path.exists(data_file):
+        print "generating %s" % data_file
+        out = open(data_file + ".tmp", "w")
+        try:
+            generate_dblp.generate(out, records, max(1, records / 2))
+        finally:
+            out.close()
+        os.rename(data_file + ".tmp", data_file)
+
+    result_file = data_file + ".result.json"
+    child = subprocess.Popen([sys.executable, path.abspath(__file__),
+        "--measure", data_file, result_file])
+    if child.wait() != 0 or not path.exists(result_file):
+        return None
+    f = open(result_file)
+    try:
+        result = json.load(f)
+    finally:
+        f.close()
+        os.remove(result_file)
+    result["records"] = records
+    result["file_bytes"] = path.getsize(data_file)
+    return result
+
+def main(argv):
+    if len(argv) == 4 and argv[1] == "--measure":
+        # child process measuring a single size
+        result = measure(argv[2])
+        if result == None:
+            return 1
+        f = open(argv[3], "w")
+        try:
+            json.dump(result, f)
+        finally:
+            f.close()
+        return 0
+
+    sizes = SIZES
+    if len(argv) > 1:
+        sizes = [ int(size) for size in argv[1].split(",") ]
+    out_file = "bench_scale.json"
+    if len(argv) > 2:
+        out_file = argv[2]
+    work_dir = path.join(tempfile.gettempdir(), "comp61542-bench")
+    if len(argv) > 3:
+        work_dir = argv[3]
+    if not path.isdir(work_dir):
+        os.makedirs(work_dir)
+
+    results = []
+    for records in sizes:
+        result = run_size(records, work_dir)
+        if result == None:
+            print "%9d records: failed" % records
+            continue
+        results.append(result)
+        print "%9d records: read %.2f s, queries %.2f s, peak RSS %.0f MB" % (
+            records, result["read_seconds"], sum(result["query_seconds"].values()),
+            result["peak_rss_bytes"] / 1048576.0)
+        slowest = sorted(result["query_seconds"].items(), key=lambda item: -item[1])
+        for label, seconds in slowest[:3]:
+            print "    %-55s %8.3f s" % (label, seconds)
+
+    f = open(out_file, "w")
+    try:
+        json.dump({"python":platform.python_version(), "platform":platform.platform(),
+                   "time":time.strftime("%Y-%m-%dT%H:%M:%S"), "sizes":results},
+                  f, indent=2, sort_keys=True)
+    finally:
+        f.close()
+    print "wrote %s" % out_file
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
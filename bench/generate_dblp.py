@@ -0,0 +1,117 @@
+'''
+Writes a synthetic DBLP file shaped like the records of data/dblp.dtd, for
+measuring how Database scales beyond the sample data.
+
+Author popularity and the number of authors per record are both skewed:
+a few authors appear on many records and most on one or two, and most
+records have two to four authors with a long tail of large ones. Name
+clashes get DBLP style numeric suffixes ("Jan Berg 0002"). A few records
+are of types Database ignores (www, phdthesis), as in the real file.
+
+usage: python bench/generate_dblp.py <out file> <records> [authors] [seed]
+
+authors defaults to half the number of records.
+'''
+import random
+import sys
+
+FIRST_NAMES = ["Anna", "Bernd", "Carlo", "Diane", "Elena", "Farid", "Grace",
+    "Hiro", "Ines", "Jan", "Kavya", "Luis", "Maria", "Nikos", "Olga", "Pavel",
+    "Qing", "Rosa", "Stefano", "Tomas", "Uma", "Victor", "Wei", "Yusuf", "Zoe"]
+LAST_NAMES = ["Berg", "Ceri", "Dubois", "Fischer", "Garcia", "Haddad",
+    "Ivanov", "Jensen", "Kim", "Lopez", "Moreau", "Novak", "Okafor", "Patel",
+    "Rossi", "Sato", "Schmidt", "Silva", "Tanaka", "Wang", "Weber", "Yilmaz"]
+WORDS = ["adaptive", "analysis", "approach", "data", "database", "design",
+    "distributed", "efficient", "evaluation", "framework", "graph", "index",
+    "learning", "model", "networks", "optimization", "parallel", "query",
+    "scalable", "semantic", "streams", "systems", "web", "workflow"]
+
+# (record tag, container element, weight); book chapters name their book
+# in booktitle like conference papers do
+RECORD_TYPES = [("inproceedings", "booktitle", 50), ("article", "journal", 38),
+    ("incollection", "booktitle", 5), ("book", "publisher", 3),
+    ("www", None, 2), ("phdthesis", "school", 2)]
+
+def author_name(i):
+    first = FIRST_NAMES[i % len(FIRST_NAMES)]
+    rest = i // len(FIRST_NAMES)
+    last = LAST_NAMES[rest % len(LAST_NAMES)]
+    homonym = rest // len(LAST_NAMES)
+    if homonym == 0:
+        return "%s %s" % (first, last)
+    return "%s %s %04d" % (first, last, homonym + 1)
+
+def author_count(rnd):
+    # mostly 2 to 4, sometimes one, rarely a few dozen
+    if rnd.random() < 0.15:
+        return 1
+    n = 2 + int(rnd.expovariate(0.7))
+    if rnd.random() < 0.01:
+        n += int(rnd.paretovariate(1.5) * 5)
+    return n
+
+def record_type(rnd):
+    x = rnd.random() * sum(weight for _, _, weight in RECORD_TYPES)
+    for tag, container, weight in RECORD_TYPES:
+        x -= weight
+        if x < 0:
+            return tag, container
+    return RECORD_TYPES[0][:2]
+
+def title(rnd):
+    words = [ rnd.choice(WORDS) for _ in range(rnd.randint(3, 9)) ]
+    words[0] = words[0].capitalize()
+    if rnd.random() < 0.05:
+        words[1] = "<i>%s</i>" % words[1]
+    if rnd.random() < 0.05:
+        words.insert(2, "&amp;")
+    return " ".join(words) + "."
+
+def year(rnd):
+    # more publications in recent years
+    return 2014 - int(45 * rnd.random() ** 2)
+
+def generate(out, records, authors, seed=0):
+    rnd = random.Random(seed)
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n<dblp>\n')
+    for i in xrange(records):
+        tag, container = record_type(rnd)
+        # popular authors have low ids
+        ids = []
+        for _ in range(author_count(rnd)):
+            a = int(authors * rnd.random() ** 3)
+            if a not in ids:
+                ids.append(a)
+        lines = [ '<%s mdate="2014-01-01" key="synthetic/%s/%d">' % (tag, tag, i) ]
+        lines.extend("    <author>%s</author>" % author_name(a) for a in ids)
+        lines.append("    <title>%s</title>" % title(rnd))
+        if tag != "www":
+            lines.append("    <year>%d</year>" % year(rnd))
+            lines.append("    <%s>%s %d</%s>" % (container, rnd.choice(WORDS).capitalize(),
+                i % 97, container))
+            lines.append("    <pages>%d-%d</pages>" % (i % 500, i % 500 + 12))
+            lines.append("    <ee>http://example.org/%d</ee>" % i)
+        lines.append("</%s>\n" % tag)
+        out.write("\n".join(lines))
+    out.write("</dblp>\n")
+
+def main(argv):
+    if len(argv) < 3:
+        print __doc__
+        return 2
+    records = int(argv[2])
+    authors = max(1, records / 2)
+    if len(argv) > 3:
+        authors = int(argv[3])
+    seed = 0
+    if len(argv) > 4:
+        seed = int(argv[4])
+    out = open(argv[1], "w")
+    try:
+        generate(out, records, authors, seed)
+    finally:
+        out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,96 @@
+'''
+Measures the requests per second a running server (src/serve.py or
+src/main.py) sustains on /averages and /author/<name>, with several
+clients sending requests concurrently.
+
+usage: python bench/load_test.py [base url] [clients] [seconds]
+'''
+import httplib
+import json
+import sys
+import threading
+import time
+import urllib
+import urlparse
+
+def fetch(host, port, url):
+    conn = httplib.HTTPConnection(host, port, timeout=60)
+    try:
+        conn.request("GET", url)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+def author_urls(host, port, count):
+    # the first names of the author index, in alphabetical order
+    conn = httplib.HTTPConnection(host, port, timeout=60)
+    try:
+        conn.request("GET", "/api/author?q=&k=%d" % count)
+        names = json.loads(conn.getresponse().read())["matches"]
+    finally:
+        conn.close()
+    return [ "/author/" + urllib.quote(name.encode("utf-8")) for name in names ]
+
+def run(host, port, urls, clients, seconds):
+    '''
+    return: (requests per second, mean latency in seconds, failed requests)
+    '''
+    done = [0] * clients
+    failed = [0] * clients
+    busy = [0.0] * clients
+    deadline = time.time() + seconds
+
+    def client(n):
+        i = n
+        while time.time() < deadline:
+            start = time.time()
+            try:
+                ok = fetch(host, port, urls[i % len(urls)]) == 200
+            except (IOError, httplib.HTTPException):
+                ok = False
+            busy[n] += time.time() - start
+            if ok:
+                done[n] += 1
+            else:
+                failed[n] += 1
+            i += 1
+
+    start = time.time()
+    threads = [ threading.Thread(target=client, args=(n,)) for n in range(clients) ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+
+    requests = sum(done) + sum(failed)
+    latency = sum(busy) / requests if requests > 0 else 0
+    return (sum(done) / elapsed, latency, sum(failed))
+
+def main(argv):
+    base = "http://localhost:9292"
+    if len(argv) > 1:
+        base = argv[1]
+    clients = 8
+    if len(argv) > 2:
+        clients = int(argv[2])
+    seconds = 10
+    if len(argv) > 3:
+        seconds = int(argv[3])
+
+    url = urlparse.urlparse(base)
+    host, port = url.hostname, url.port or 80
+    tests = [("/averages", ["/averages"]),
+             ("/author/<name>", author_urls(host, port, 100))]
+
+    print "%s, %d clients, %d s per test" % (base, clients, seconds)
+    for label, urls in tests:
+        rate, latency, failed = run(host, port, urls, clients, seconds)
+        print "%-16s %8.1f req/s %8.1f ms mean latency %6d failed" % (
+            label, rate, latency * 1000, failed)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -3,3 +3,4 @@ from flask import Flask
 app = Flask(__name__)
 
 from comp61542 import views
+from comp61542 import api
@@ -0,0 +1,146 @@
+from comp61542 import app
+from comp61542.views import (approximate, search_limit, table_args, top_args)
+from database import database
+from flask import (Response, abort, request)
+import hashlib
+import json
+import zlib
+import numpy as np
+
+# responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+def to_json(obj):
+    # NumPy results are serialized as they are, without formatting each cell
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError("%r is not JSON serializable" % (obj,))
+
+def etag():
+    # a response only changes with the loaded data: its version identifies
+    # it across restarts, the generation within the process
+    db = app.config['DATABASE']
+    version = ""
+    if hasattr(db, "data_version"):
+        version = db.data_version()
+    key = "%s:%s:%s:%s" % (app.config['DATASET'], version,
+        getattr(db, "generation", 0), request.full_path)
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+def json_response(build):
+    '''
+    args: a function returning the object to send. It is not called when
+        the client already holds the current version (If-None-Match).
+    '''
+    tag = etag()
+    if request.if_none_match.contains(tag):
+        response = Response(status=304)
+        response.set_etag(tag)
+        return response
+
+    body = json.dumps(build(), default=to_json, separators=(",", ":"))
+    response = Response(body, mimetype="application/json")
+    if (len(body) >= GZIP_MIN_BYTES and
+            "gzip" in request.headers.get("Accept-Encoding", "")):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        response.set_data(compressor.compress(body) + compressor.flush())
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.set_etag(tag)
+    return response
+
+def table(data):
+    header, rows = data
+    return {"header":header, "rows":rows}
+
+@app.route("/api/averages")
+def apiAverages():
+    db = app.config['DATABASE']
+
+    def build():
+        header, summary = db.get_averages_summary()
+        tables = [ {"title":title, "header":["Average"] + list(header), "rows":rows}
+            for title, rows in summary ]
+        return {"dataset":app.config['DATASET'], "tables":tables}
+    return json_response(build)
+
+@app.route("/api/statisticsdetails/<status>")
+def apiPublicationSummary(status):
+    db = app.config['DATABASE']
+    queries = {
+        "publication_summary":lambda: db.get_publication_summary(approximate=approximate()),
+        "publication_author":lambda: (database.PUBLICATIONS_BY_AUTHOR_HEADER,
+            list(db.iter_publications_by_author(
+                **table_args(len(database.PUBLICATIONS_BY_AUTHOR_HEADER))))),
+        "publication_year":db.get_publications_by_year,
+        "author_year":lambda: db.get_author_totals_by_year(approximate=approximate()) }
+    if status not in queries:
+        abort(404)
+    return json_response(lambda: table(queries[status]()))
+
+@app.route("/api/coauthors")
+def apiCoAuthors():
+    db = app.config['DATABASE']
+    start_year = db.min_year
+    if "start_year" in request.args:
+        start_year = int(request.args.get("start_year"))
+    end_year = db.max_year
+    if "end_year" in request.args:
+        end_year = int(request.args.get("end_year"))
+    pub_type = 4
+    if "pub_type" in request.args:
+        pub_type = int(request.args.get("pub_type"))
+
+    return json_response(lambda: table((database.COAUTHOR_HEADER,
+        list(db.iter_coauthor_data(start_year, end_year, pub_type,
+            **table_args(len(database.COAUTHOR_HEADER)))))))
+
+@app.route("/api/author/<name>")
+def apiAuthors(name):
+    db = app.config['DATABASE']
+    if name not in db.author_idx:
+        abort(404)
+
+    def build():
+        coauthors = [ c for c in db.get_coauthor_details(name) if c[0] != name ]
+        return {
+            "name":name,
+            "stats":db.get_publications_by_author_name(name),
+            "detailed_stats":db.get_detailed_publications_by_author_name(name),
+            "total_coauthors":len(coauthors),
+            "coauthors":coauthors }
+    return json_response(build)
+
+@app.route("/api/author")
+def apiAuthorsSearch():
+    db = app.config['DATABASE']
+    query = request.args.get("q", "")
+    return json_response(lambda: {"query":query,
+        "matches":db.search_authors(query, search_limit())})
+
+@app.route("/api/topauthors")
+def apiTopAuthors():
+    db = app.config['DATABASE']
+    return json_response(lambda: table(db.get_top_authors(**top_args())))
+
+@app.route("/api/topcoauthors/<name>")
+def apiTopCoAuthors(name):
+    db = app.config['DATABASE']
+    if name not in db.author_idx:
+        abort(404)
+    return json_response(lambda: table(db.get_top_coauthors(name, **top_args())))
+
+@app.route("/api/warmup")
+def apiWarmUp():
+    # progress of the precomputation started after loading (comp61542.warmup);
+    # it changes within a generation, so it is sent without an ETag
+    warm_up = app.config.get('WARMUP')
+    status = {"done":True, "completed":0, "total":0, "reports":[]}
+    if warm_up != None:
+        status = warm_up.status()
+    return Response(json.dumps(status, separators=(",", ":")),
+        mimetype="application/json")
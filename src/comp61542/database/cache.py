@@ -0,0 +1,165 @@
+'''
+Memoization of Database query results.
+
+Results are keyed by method name and the value of each parameter, with
+defaults filled in, so f(), f(x=False) and f(False) share an entry. They
+are tagged with the database generation they were computed at; Database
+bumps its generation whenever a publication is added, which drops every
+cached result. Entries are evicted least recently used first once their
+estimated size exceeds the byte budget.
+
+A result is computed once however many threads ask for it at the same
+time: the first computes it and the others wait for its value.
+
+Cached results are shared between callers and must not be modified.
+'''
+from collections import OrderedDict
+import functools
+import inspect
+import sys
+import threading
+
+import numpy as np
+
+def estimate_size(obj):
+    '''
+    return: a rough estimate, in bytes, of the memory held by obj and the
+        lists, tuples, sets, dicts and arrays it contains.
+    '''
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.iteritems())
+    return size
+
+class InFlight:
+    # a result being computed, which other threads wait for
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = False
+
+class ResultCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict() # key -> (value, size), oldest first
+        self.in_flight = {} # (key, generation) -> InFlight
+        self.generation = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_generation(self, generation):
+        if generation != self.generation:
+            self.entries.clear()
+            self.bytes = 0
+            self.generation = generation
+
+    '''
+    return: a tuple (found, value)
+    '''
+    def get(self, key, generation):
+        with self.lock:
+            self._check_generation(generation)
+            try:
+                value, size = self.entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return (False, None)
+            # re-insert as the most recently used entry
+            self.entries[key] = (value, size)
+            self.hits += 1
+            return (True, value)
+
+    '''
+    Computes the value of a key that get did not find by calling compute,
+    and caches it. A thread asking for a key another thread is computing
+    waits for that value instead of computing it again; if the computation
+    fails, each waiting thread computes the value itself.
+    '''
+    def compute(self, key, generation, compute):
+        with self.lock:
+            self._check_generation(generation)
+            if key in self.entries:
+                # cached since get was called
+                return self.entries[key][0]
+            flight = self.in_flight.get((key, generation))
+            owner = flight == None
+            if owner:
+                flight = self.in_flight[(key, generation)] = InFlight()
+
+        if not owner:
+            flight.done.wait()
+            if flight.failed:
+                return compute()
+            return flight.value
+
+        try:
+            flight.value = compute()
+            self.put(key, generation, flight.value)
+        except:
+            flight.failed = True
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[(key, generation)]
+            flight.done.set()
+        return flight.value
+
+    def put(self, key, generation, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self._check_generation(generation)
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return { "hits":self.hits, "misses":self.misses,
+                     "evictions":self.evictions, "entries":len(self.entries),
+                     "bytes":self.bytes, "max_bytes":self.max_bytes }
+
+def cached(method):
+    '''
+    Decorator for Database query methods. The result is looked up in
+    self.cache, keyed by method name and parameter values, at self.generation.
+    Methods are called directly when the database has no cache.
+    '''
+    name = method.__name__
+    self_name = inspect.getargspec(method).args[0]
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self.cache
+        if cache == None:
+            return method(self, *args, **kwargs)
+        values = inspect.getcallargs(method, self, *args, **kwargs)
+        del values[self_name]
+        key = (name, tuple(sorted(values.items())))
+        generation = self.generation
+        found, value = cache.get(key, generation)
+        if not found:
+            value = cache.compute(key, generation,
+                lambda: method(self, *args, **kwargs))
+        return value
+    # the undecorated method, for its signature
+    wrapper.__wrapped__ = method
+    return wrapper
@@ -0,0 +1,134 @@
+import itertools
+import numpy as np
+
+class PublicationView(object):
+    '''
+    Read-only stand-in for a Publication stored in a PublicationTable.
+    It exposes the same pub_type, title, year and authors attributes but
+    only holds a reference to the table and the row index.
+    '''
+    __slots__ = ("_table", "_idx")
+
+    def __init__(self, table, idx):
+        self._table = table
+        self._idx = idx
+
+    @property
+    def pub_type(self):
+        return int(self._table.pub_types[self._idx])
+
+    @property
+    def title(self):
+        return self._table.titles[self._idx]
+
+    @property
+    def year(self):
+        return int(self._table.years[self._idx])
+
+    @property
+    def authors(self):
+        offsets = self._table.offsets
+        return self._table.author_ids[offsets[self._idx]:offsets[self._idx + 1]].tolist()
+
+class PublicationTable(object):
+    '''
+    Columnar storage for publications. pub_type and year are kept in compact
+    NumPy arrays and the author lists in CSR form: the ids of publication i
+    are author_ids[offsets[i]:offsets[i + 1]]. The arrays are over-allocated
+    and grown geometrically, so only the first len(self) rows are valid.
+
+    The table behaves like the list of Publication objects Database uses by
+    default: it supports len(), indexing, iteration and append().
+    '''
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self):
+        self.size = 0
+        self.n_author_ids = 0
+        self.pub_types = np.zeros(self.INITIAL_CAPACITY, dtype=np.int8)
+        self.years = np.zeros(self.INITIAL_CAPACITY, dtype=np.int16)
+        self.offsets = np.zeros(self.INITIAL_CAPACITY + 1, dtype=np.int64)
+        self.author_ids = np.zeros(self.INITIAL_CAPACITY * 4, dtype=np.int32)
+        self.titles = []
+
+    @classmethod
+    def from_columns(cls, columns, titles):
+        '''
+        Wraps existing arrays (for example memory mapped ones) without
+        copying them. They are copied into larger arrays on the first append.
+        '''
+        table = cls()
+        table.pub_types, table.years, table.author_ids, table.offsets = columns
+        table.titles = titles
+        table.size = len(table.pub_types)
+        table.n_author_ids = len(table.author_ids)
+        return table
+
+    def _grow(self, array, needed):
+        # arrays wrapped by from_columns can be empty
+        capacity = max(len(array), 1)
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros(capacity, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def append(self, publication):
+        n = self.size
+        authors = publication.authors
+        start = self.n_author_ids
+        end = start + len(authors)
+
+        if n + 1 > len(self.pub_types):
+            self.pub_types = self._grow(self.pub_types, n + 1)
+            self.years = self._grow(self.years, n + 1)
+        if n + 2 > len(self.offsets):
+            self.offsets = self._grow(self.offsets, n + 2)
+        if end > len(self.author_ids):
+            self.author_ids = self._grow(self.author_ids, end)
+
+        self.pub_types[n] = publication.pub_type
+        self.years[n] = publication.year
+        self.author_ids[start:end] = authors
+        self.offsets[n + 1] = end
+        self.titles.append(publication.title)
+        self.n_author_ids = end
+        self.size = n + 1
+
+    def columns(self):
+        '''
+        return: a tuple (pub_types, years, author_ids, offsets) of arrays
+            trimmed to the publications stored so far.
+        '''
+        n = self.size
+        return (self.pub_types[:n], self.years[:n],
+            self.author_ids[:self.n_author_ids], self.offsets[:n + 1])
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self.size
+        if idx < 0 or idx >= self.size:
+            raise IndexError("publication index out of range")
+        return PublicationView(self, idx)
+
+    def __iter__(self):
+        for i in xrange(self.size):
+            yield PublicationView(self, i)
+
+def publication_columns(publications):
+    '''
+    Builds the arrays PublicationTable.columns() returns from any sequence
+    of Publication objects.
+    '''
+    n = len(publications)
+    pub_types = np.fromiter((p.pub_type for p in publications), dtype=np.int8, count=n)
+    years = np.fromiter((p.year for p in publications), dtype=np.int16, count=n)
+    lengths = np.fromiter((len(p.authors) for p in publications), dtype=np.int64, count=n)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    author_ids = np.fromiter(itertools.chain.from_iterable(p.authors for p in publications),
+        dtype=np.int32, count=offsets[-1])
+    return (pub_types, years, author_ids, offsets)
@@ -1,11 +1,52 @@
-from comp61542.statistics import average
+from comp61542.statistics import (accumulator, average)
+from comp61542.statistics.hyperloglog import HyperLogLog
+from comp61542.database.columnar import (PublicationTable, publication_columns)
+from comp61542.database import (parallel, snapshot)
+from comp61542.database.cache import (ResultCache, cached)
+from comp61542.database.keys import KeyIndex
+from comp61542.database.search import NameIndex
+import hashlib
+import heapq
 import itertools
 import numpy as np
+import os
 from xml.sax import handler, make_parser, SAXException
+try:
+    from xml.parsers import expat
+except ImportError:
+    expat = None
 
 PublicationType = ["Conference Paper", "Journal", 
                    "Book", "Book Chapter"]
 
+# generation numbers are unique across the Database objects of a process,
+# so a database swapped in for another never reuses one of its numbers
+generations = itertools.count(1)
+
+# author occurrences added to the HyperLogLog sketches at a time
+SKETCH_CHUNK = 1 << 20
+# author pairs generated at a time when listing co-authors
+COAUTHOR_CHUNK = 1 << 22
+
+# headers of the tables that also have iter_* row generators
+COAUTHOR_HEADER = ("Author", "Co-Authors")
+PUBLICATIONS_BY_AUTHOR_HEADER = ("Author Last Name","Author First Name" ,"Number of conference papers",
+    "Number of journals", "Number of books",
+    "Number of book chapers", "Total")
+
+def exclusion_warning(pub_type, title, year, authors):
+    return ("Warning: excluding publication due to missing information\n"
+        "    Publication type: %s\n    Title: %s\n    Year: %s\n    Authors: %s"
+        % (PublicationType[pub_type], title, year, ",".join(authors)))
+
+def file_stat(filename):
+    st = os.stat(filename)
+    return (os.path.abspath(filename), st.st_size, st.st_mtime)
+
+def missing_title_warning(pub_type, year, authors):
+    return "Warning: adding publication with missing title [ %s %s (%s) ]" % (
+        PublicationType[pub_type], year, ",".join(authors))
+
 class Publication:
     CONFERENCE_PAPER = 0
     JOURNAL = 1
@@ -23,25 +64,227 @@ class Publication:
         # The instance variables must be decleared clearly
         self.authors = authors
 
-class Author:
-    def __init__(self, name):
+class Author(object):
+    # there is one Author per distinct name, so no per-instance __dict__
+    __slots__ = ("name", "first_name", "last_name")
+
+    '''
+    first_name, last_name: split from name when not given. The last name
+        is the last word of the name and the first name the words before it.
+    '''
+    def __init__(self, name, first_name=None, last_name=None):
         self.name = name
+        if last_name == None:
+            parts = name.split()
+            last_name = parts[-1] if parts else name
+            first_name = ' '.join(parts[:-1])
+        self.first_name = first_name
+        self.last_name = last_name
 
 class Stat:
     STR = ["Mean", "Median", "Mode"]
     FUNC = [average.mean, average.median, average.mode]
+    ACC = [accumulator.MeanAccumulator, accumulator.MedianAccumulator,
+           accumulator.ModeAccumulator]
     MEAN = 0
     MEDIAN = 1
     MODE = 2
 
+class AuthorSummary:
+    # column offsets in Database.author_summary; the first four groups have
+    # one column per publication type
+    PUBLICATIONS = 0
+    FIRST = 4
+    LAST = 8
+    SOLE = 12
+    COAUTHORS = 16
+    COLUMNS = 17
+
 class Database:
-    def read(self, filename):
-        self.publications = []
+    '''
+    columnar: store publications in a PublicationTable (NumPy arrays)
+        instead of a list of Publication objects.
+    cache_bytes: budget of the cache of query results, 0 disables it.
+    '''
+    def __init__(self, columnar=False, cache_bytes=64 * 1024 * 1024):
+        self.columnar = columnar
+        self.cache = None
+        if cache_bytes > 0:
+            self.cache = ResultCache(cache_bytes)
+        # changes whenever the data changes, which invalidates cached results
+        self.generation = generations.next()
+
+    def _reset(self):
+        if self.columnar:
+            self.publications = PublicationTable()
+        else:
+            self.publications = []
         self.authors = []
         self.author_idx = {}
+        # one shared copy of every first and last name, see _new_author
+        self.name_parts = {}
+        # author_pubs[author_id] lists the indexes in self.publications of
+        # every publication the author appears in, in insertion order
+        self.author_pubs = []
+        # year_type_pubs[(year, pub_type)] lists the indexes of the
+        # publications of that year and type, in insertion order
+        self.year_type_pubs = {}
+        # filled by build_author_summary
+        self.author_summary = None
+        # built once the data is loaded, see search_authors
+        self.name_index = None
+        # DBLP keys of the publications, a record whose key is already in
+        # it is skipped
+        self.pub_keys = KeyIndex()
+        self._columns = None
         self.min_year = None
         self.max_year = None
+        # see data_version
+        self.version = None
+        # (path, size, mtime) of every update file appended, see append
+        self.updates = []
+        self.generation = generations.next()
+
+    '''
+    use_sax: parse with the xml.sax DocumentHandler instead of driving
+        expat directly. SAX is also used when expat is not available.
+    processes: parse shards of the file in this many worker processes.
+        The result is identical to a sequential read.
+    '''
+    def read(self, filename, use_sax=False, processes=1):
+        self._reset()
+
+        if use_sax or expat == None:
+            valid = self._parse_sax(filename)
+        elif processes > 1:
+            valid = self._parse_parallel(filename, processes)
+        else:
+            valid = self._parse_expat(filename)
+
+        for p in self.publications:
+            if self.min_year == None or p.year < self.min_year:
+                self.min_year = p.year
+            if self.max_year == None or p.year > self.max_year:
+                self.max_year = p.year
+
+        self.name_index = NameIndex([ a.name for a in self.authors ])
+        self.pub_keys.hashes()
+        self.version = None
+        return valid
+
+    '''
+    Adds the publications of another DBLP file, typically an update, to the
+    ones already loaded. Records whose key is already loaded are skipped.
+    The indexes, the author summary and the year range are updated record
+    by record, so the cost depends on the size of filename only. A file
+    read without errors is added to self.updates.
+    '''
+    def append(self, filename, use_sax=False):
+        if not hasattr(self, "publications"):
+            return self.read(filename, use_sax)
+        version = self.data_version()
+        if use_sax or expat == None:
+            valid = self._parse_sax(filename)
+        else:
+            valid = self._parse_expat(filename)
+        self.pub_keys.hashes()
+        if self.name_index != None:
+            self.name_index.merge()
+        # the same update applied to the same data gives the same version
+        stat = file_stat(filename)
+        self.version = hashlib.md5("%s:%s:%d:%r" % ((version,) + stat)).hexdigest()
+        if valid:
+            self.updates.append(stat)
+        return valid
+
+    '''
+    return: a string identifying the loaded data, unlike generation, which
+        only orders the changes made within the process. A parsed file
+        gets a random version, which its snapshot keeps, and appending an
+        update derives a new one from the update file. Any other change
+        draws a new random version.
+    '''
+    def data_version(self):
+        version = self.version
+        if version == None:
+            version = self.version = os.urandom(8).encode("hex")
+        return version
+
+    '''
+    Writes the parsed state to snapshot_dir so that load_snapshot can
+    restore it without parsing source again.
+    '''
+    def save_snapshot(self, snapshot_dir, source):
+        titles = self.publications.titles if self.columnar else [ p.title for p in self.publications ]
+        snapshot.save(snapshot_dir, source, self._get_columns(), titles,
+            [ a.name for a in self.authors ], self.pub_keys.hashes(),
+            self.min_year, self.max_year, self.data_version(), self.updates)
+
+    '''
+    Restores the state saved by save_snapshot, memory mapping the arrays.
+    The database switches to columnar storage.
+    return: False if there is no snapshot or source changed since it was saved
+    '''
+    def load_snapshot(self, snapshot_dir, source):
+        data = snapshot.load(snapshot_dir, source)
+        if data == None:
+            return False
+
+        self.columnar = True
+        self._reset()
+        self.load_columns(data["columns"], data["titles"], data["names"], data["key_hashes"])
+        self.min_year = data["min_year"]
+        self.max_year = data["max_year"]
+        self.name_index = NameIndex(data["names"])
+        self.version = data["data_version"]
+        self.updates = data["updates"]
+        return True
+
+    '''
+    Replaces the publications by those of the given columns (as returned
+    by _get_columns) and rebuilds the indexes from them in one pass.
+    titles: the title of each publication
+    names: the name of each author id
+    key_hashes: the sorted int64 array of the hashes of their DBLP keys
+    '''
+    def load_columns(self, columns, titles, names, key_hashes):
+        if self.columnar:
+            self.publications = PublicationTable.from_columns(columns, titles)
+        else:
+            pub_types, years, author_ids, offsets = columns
+            bounds = offsets.tolist()
+            ids = author_ids.tolist()
+            self.publications = [ Publication(t, title, y, ids[bounds[i]:bounds[i + 1]])
+                for i, (t, title, y) in enumerate(itertools.izip(
+                    pub_types.tolist(), titles, years.tolist())) ]
+            self._columns = (len(self.publications), columns)
+        self.authors = [ self._new_author(name) for name in names ]
+        self.author_idx = dict(itertools.izip(names, itertools.count()))
+        self._build_author_pubs()
+        self._build_year_type_pubs()
+        self.pub_keys = KeyIndex(key_hashes)
+        self.version = None
+        self.generation = generations.next()
 
+    '''
+    Loads filename through its snapshot (by default filename + ".snapshot"),
+    parsing the XML and writing a fresh snapshot only when the snapshot is
+    missing or stale.
+    '''
+    def read_cached(self, filename, snapshot_dir=None):
+        if snapshot_dir == None:
+            snapshot_dir = filename + ".snapshot"
+        if self.load_snapshot(snapshot_dir, filename):
+            return True
+        if not self.read(filename):
+            return False
+        try:
+            self.save_snapshot(snapshot_dir, filename)
+        except (IOError, OSError) as e:
+            print "Warning: could not write snapshot %s (%s)" % (snapshot_dir, e)
+        return True
+
+    def _parse_sax(self, filename):
         handler = DocumentHandler(self)
         parser = make_parser()
         parser.setContentHandler(handler)
@@ -53,27 +296,85 @@ class Database:
             valid = False
             print "Error reading file (" + e.getMessage() + ")"
         infile.close()
+        return valid
 
-        for p in self.publications:
-            if self.min_year == None or p.year < self.min_year:
-                self.min_year = p.year
-            if self.max_year == None or p.year > self.max_year:
-                self.max_year = p.year
-
+    def _parse_expat(self, filename):
+        handler = ExpatDocumentHandler(self)
+        infile = open(filename, "rb")
+        valid = True
+        try:
+            handler.parse(infile, os.path.abspath(filename))
+        except expat.ExpatError as e:
+            valid = False
+            print "Error reading file (" + expat.ErrorString(e.code) + ")"
+        infile.close()
         return valid
 
-    def add_publication(self, pub_type, title, year, authors):
+    def _parse_parallel(self, filename, processes):
+        try:
+            parsed = parallel.read(filename, processes)
+        except parallel.ParseError as e:
+            print "Error reading file (" + str(e) + ")"
+            return False
+        if parsed == None:
+            # the file has no record boundaries to split at
+            return self._parse_expat(filename)
+        self.load_columns(*parsed)
+        return True
+
+    # rebuilds self.author_pubs from the columns in one vectorized pass
+    def _build_author_pubs(self):
+        _, _, author_ids, offsets = self._get_columns()
+        pub_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        # stable sort keeps each author's publications in insertion order
+        order = np.argsort(author_ids, kind="mergesort")
+        authors = author_ids[order]
+        pub_ids = pub_ids[order]
+        # drop repeats of an author within a single publication
+        keep = np.ones(len(authors), dtype=np.bool_)
+        keep[1:] = (authors[1:] != authors[:-1]) | (pub_ids[1:] != pub_ids[:-1])
+        authors = authors[keep]
+        pub_ids = pub_ids[keep].tolist()
+
+        bounds = np.zeros(len(self.authors) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(authors, minlength=len(self.authors)), out=bounds[1:])
+        bounds = bounds.tolist()
+        self.author_pubs = [ pub_ids[bounds[i]:bounds[i + 1]] for i in xrange(len(self.authors)) ]
+
+    # rebuilds self.year_type_pubs from the columns in one vectorized pass
+    def _build_year_type_pubs(self):
+        pub_types, years, _, _ = self._get_columns()
+        keys = years.astype(np.int64) * 4 + pub_types
+        order = np.argsort(keys, kind="mergesort")
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])[:len(keys)]
+        ends = np.r_[starts[1:], len(keys)]
+        order = order.tolist()
+        self.year_type_pubs = {}
+        for key, start, end in zip(keys[starts].tolist(), starts.tolist(), ends.tolist()):
+            self.year_type_pubs[(key // 4, key % 4)] = order[start:end]
+
+    # many authors share a first or last name; they all share one string
+    def _new_author(self, name):
+        author = Author(name)
+        author.first_name = self.name_parts.setdefault(author.first_name, author.first_name)
+        author.last_name = self.name_parts.setdefault(author.last_name, author.last_name)
+        return author
+
+    '''
+    key: the DBLP key of the record, if it has one. The publication is not
+        added if a publication with the same key already was.
+    '''
+    def add_publication(self, pub_type, title, year, authors, key=None):
+        if key != None and key in self.pub_keys:
+            return
         if year == None or len(authors) == 0:
             # Logger class is a better option to print such warnings instead of print
-            print "Warning: excluding publication due to missing information"
-            print "    Publication type:", PublicationType[pub_type]
-            print "    Title:", title
-            print "    Year:", year
-            print "    Authors:", ",".join(authors)
+            print exclusion_warning(pub_type, title, year, authors)
             return
         if title == None:
             # again same comment as above
-            print "Warning: adding publication with missing title [ %s %s (%s) ]" % (PublicationType[pub_type], year, ",".join(authors))
+            print missing_title_warning(pub_type, year, authors)
         
         # author is assigned and id, which is the index the Author object is added at in self.authors array
         idlist = []
@@ -84,9 +385,26 @@ class Database:
                 a_id = len(self.authors) # author id is its index in self.authors
                 self.author_idx[a] = a_id
                 idlist.append(a_id)
-                self.authors.append(Author(a))
-        self.publications.append(
-            Publication(pub_type, title, year, idlist))
+                self.authors.append(self._new_author(a))
+                self.author_pubs.append([])
+                if self.name_index != None:
+                    self.name_index.add(a, a_id)
+        pub_id = len(self.publications)
+        pub = Publication(pub_type, title, year, idlist)
+        self.publications.append(pub)
+        try:
+            self.year_type_pubs[(pub.year, pub.pub_type)].append(pub_id)
+        except KeyError:
+            self.year_type_pubs[(pub.year, pub.pub_type)] = [pub_id]
+        for a_id in idlist:
+            # an author listed twice on the same publication is indexed once
+            pubs = self.author_pubs[a_id]
+            if len(pubs) == 0 or pubs[-1] != pub_id:
+                pubs.append(pub_id)
+        if self.author_summary is not None:
+            self._update_author_summary(pub_id, pub)
+        if key != None:
+            self.pub_keys.add(key)
         if (len(self.publications) % 100000) == 0:
             print "Adding publication number %d (number of authors is %d)" % (len(self.publications), len(self.authors))
 
@@ -94,169 +412,430 @@ class Database:
             self.min_year = year
         if self.max_year == None or year > self.max_year:
             self.max_year = year
+        self.version = None
+        self.generation = generations.next()
             
+    '''
+    return: the (pub_types, years, author_ids, offsets) arrays described in
+        PublicationTable.columns(). For the list storage they are built on
+        first use and rebuilt once more publications have been added.
+    '''
+    def _get_columns(self):
+        if self.columnar:
+            return self.publications.columns()
+        if self._columns == None or self._columns[0] != len(self.publications):
+            self._columns = (len(self.publications), publication_columns(self.publications))
+        return self._columns[1]
+
+    '''
+    return: a Stat.ACC[av] accumulator fed with the values of the integer
+        array, as (value, count) pairs in order of first appearance
+    '''
+    def _accumulate(self, av, values):
+        acc = Stat.ACC[av]()
+        keys, first, counts = np.unique(values, return_index=True, return_counts=True)
+        for i in np.argsort(first, kind="mergesort"):
+            acc.push(keys[i].item(), counts[i].item())
+        return acc
+
+    '''
+    return: a Stat.ACC[av] accumulator fed with a column of n float counts
+        that is zero except for counts[i] at row authors[i] (authors sorted
+        and distinct), in the order the values first appear in the column
+    '''
+    def _accumulate_sparse(self, av, authors, counts, n):
+        values, first, nvalues = np.unique(counts, return_index=True, return_counts=True)
+        entries = zip(authors[first].tolist(), values, nvalues.tolist())
+        if len(authors) < n:
+            # the first zero is at the first row missing from authors
+            gaps = np.flatnonzero(authors != np.arange(len(authors)))
+            zero_first = len(authors)
+            if len(gaps) > 0:
+                zero_first = gaps[0]
+            entries.append((zero_first, np.float64(0), n - len(authors)))
+        entries.sort()
+
+        acc = Stat.ACC[av]()
+        for _, value, count in entries:
+            acc.push(value, count)
+        return acc
+
+    # merges accumulators into a new one, the column over all types
+    def _merge_accumulators(self, av, accs):
+        total = Stat.ACC[av]()
+        for acc in accs:
+            total.merge(acc)
+        return total
+
+    def _get_author_publications(self, author_id):
+        return [ self.publications[i] for i in self.author_pubs[author_id] ]
+
     def get_all_authors(self):
         return self.author_idx.keys()
 
-    def get_coauthor_data(self, start_year, end_year, pub_type):
+    '''
+    return: the sorted indexes of the publications published between
+        start_year and end_year (either may be None) of type pub_type
+        (4 for all types), read from the year_type_pubs buckets.
+    '''
+    def _get_publications_in_range(self, start_year, end_year, pub_type):
+        pub_ids = []
+        for (year, t), bucket in self.year_type_pubs.iteritems():
+            if ((start_year == None or year >= start_year) and
+                (end_year == None or year <= end_year) and
+                (pub_type == 4 or pub_type == t)):
+                pub_ids.extend(bucket)
+        # visit publications in the order a full scan would
+        pub_ids.sort()
+        return pub_ids
+
+    # author id -> set of co-author ids, for the authors with co-authors
+    @cached
+    def _get_coauthor_sets(self, start_year, end_year, pub_type):
         coauthors = {}
-        for p in self.publications:
-            if ((start_year == None or p.year >= start_year) and
-                (end_year == None or p.year <= end_year) and
-                (pub_type == 4 or pub_type == p.pub_type)):
-                for a in p.authors:
-                    for a2 in p.authors:
-                        if a != a2:
-                            try:
-                                coauthors[a].add(a2)
-                            except KeyError:
-                                coauthors[a] = set([a2])
+        for i in self._get_publications_in_range(start_year, end_year, pub_type):
+            p = self.publications[i]
+            for a in p.authors:
+                for a2 in p.authors:
+                    if a != a2:
+                        try:
+                            coauthors[a].add(a2)
+                        except KeyError:
+                            coauthors[a] = set([a2])
+        return coauthors
+
+    '''
+    sort: 0 orders the rows by author name, 1 by number of co-authors
+    '''
+    def iter_coauthor_data(self, start_year, end_year, pub_type, sort=None,
+            reverse=False, offset=0, limit=None):
+        coauthors = self._get_coauthor_sets(start_year, end_year, pub_type)
         def display(db, coauthors, author_id):
             return "%s (%d)" % (db.authors[author_id].name, len(coauthors[author_id]))
 
-        header = ("Author", "Co-Authors")
-        data = []
-        for a in coauthors:
-            data.append([ display(self, coauthors, a),
+        ids = coauthors.keys()
+        key = None
+        if sort == 0:
+            key = lambda i: self.authors[ids[i]].name
+        elif sort == 1:
+            key = lambda i: len(coauthors[ids[i]])
+        for i in self._select_rows(len(ids), key, reverse, offset, limit):
+            a = ids[i]
+            yield [ display(self, coauthors, a),
                 ", ".join([
-                    display(self, coauthors, ca) for ca in coauthors[a] ]) ])
-
-        return (header, data)
-
-    def get_average_authors_per_publication(self, av):
-        header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
+                    display(self, coauthors, ca) for ca in coauthors[a] ]) ]
 
-        auth_per_pub = [[], [], [], []]
+    @cached
+    def get_coauthor_data(self, start_year, end_year, pub_type):
+        data = list(self.iter_coauthor_data(start_year, end_year, pub_type))
+        return (COAUTHOR_HEADER, data)
 
-        for p in self.publications:
-            auth_per_pub[p.pub_type].append(len(p.authors))
+    '''
+    Counts distinct authors without building sets of author ids: every
+    author occurrence becomes a cell * na + author key, and the distinct
+    keys are counted per cell after sorting them. With approximate set,
+    HyperLogLog sketches estimate the counts instead (see
+    statistics.hyperloglog for the error bound). The occurrences are then
+    added about SKETCH_CHUNK at a time, so apart from pub_cells the memory
+    used does not grow with the data.
+    pub_cells: int64 array of the cell of each publication,
+        group * 4 + publication type
+    return: an ngroups x 5 int array of the number of distinct authors of
+        each cell and, in the last column, of each group
+    '''
+    def _count_distinct_authors(self, pub_cells, ngroups, approximate=False):
+        _, _, author_ids, offsets = self._get_columns()
+
+        if approximate:
+            sketches = HyperLogLog(ngroups * 4)
+            start = 0
+            while start < len(pub_cells):
+                # whole publications, at least one
+                end = np.searchsorted(offsets, offsets[start] + SKETCH_CHUNK, side="right") - 1
+                end = max(int(end), start + 1)
+                sketches.add(np.repeat(pub_cells[start:end], np.diff(offsets[start:end + 1])),
+                    author_ids[offsets[start]:offsets[end]])
+                start = end
+            by_type = np.rint(sketches.estimate()).astype(np.int64)
+            by_group = np.rint(sketches.union(4).estimate()).astype(np.int64)
+        else:
+            na = len(self.authors)
+            cells = np.repeat(pub_cells, np.diff(offsets))
+            authors = author_ids.astype(np.int64)
+            keys = np.unique(cells * na + authors)
+            by_type = np.bincount(keys // na, minlength=ngroups * 4)
+            keys = np.unique((cells // 4) * na + authors)
+            by_group = np.bincount(keys // na, minlength=ngroups)
+        return np.column_stack((by_type.reshape((ngroups, 4)), by_group))
+
+    # distinct authors of each (year, type) cell and year, with a row per
+    # year from min_year to max_year
+    @cached
+    def _get_distinct_authors_by_year(self, approximate=False):
+        pub_types, years, _, _ = self._get_columns()
+        nyears = 0
+        min_year = 0
+        if len(years) > 0:
+            nyears = int(self.max_year) - int(self.min_year) + 1
+            min_year = self.min_year
+        pub_cells = (years.astype(np.int64) - min_year) * 4 + pub_types
+        return self._count_distinct_authors(pub_cells, nyears, approximate)
 
+    '''
+    return: the distributions behind the averages tables, computed together
+        in one pass over the columns and shared by every statistic:
+        "authors_per_publication", one array of author counts per type,
+        and "publications_per_author", "publications_in_a_year" (float)
+        and "authors_in_a_year" (integer), matrices with a row per author
+        or year from min_year to max_year and a column per type plus one
+        for all types.
+    '''
+    @cached
+    def _get_average_distributions(self):
+        pub_types, years, _, offsets = self._get_columns()
+        lengths = np.diff(offsets)
+        nyears = 0
+        min_year = 0
+        if len(years) > 0:
+            nyears = int(self.max_year) - int(self.min_year) + 1
+            min_year = self.min_year
+
+        # the (year, type) cell of every publication
+        cells = (years.astype(np.int64) - min_year) * 4 + pub_types
+
+        pubs_by_author = self._get_publication_counts_by_author()
+        pubs_by_year = np.bincount(cells, minlength=nyears * 4).reshape((nyears, 4))
+
+        return {
+            "authors_per_publication":[ lengths[pub_types == i] for i in range(4) ],
+            "publications_per_author":np.column_stack((pubs_by_author,
+                pubs_by_author.sum(axis=1))).astype(float),
+            "publications_in_a_year":np.column_stack((pubs_by_year,
+                pubs_by_year.sum(axis=1))).astype(float),
+            "authors_in_a_year":self._get_distinct_authors_by_year() }
+
+    # the statistic of each column of one of the distribution matrices
+    def _get_average_row(self, av, name):
+        columns = self._get_average_distributions()[name]
         func = Stat.FUNC[av]
+        return [ func(columns[:, i]) for i in range(5) ]
 
-        data = [ func(auth_per_pub[i]) for i in np.arange(4) ] + [ func(list(itertools.chain(*auth_per_pub))) ]
-        return (header, data)
+    def _get_authors_per_publication_row(self, av):
+        auth_per_pub = [ self._accumulate(av, lengths) for lengths in
+            self._get_average_distributions()["authors_per_publication"] ]
+        return ([ acc.finalize() for acc in auth_per_pub ]
+            + [ self._merge_accumulators(av, auth_per_pub).finalize() ])
 
-    def get_average_publications_per_author(self, av):
+    @cached
+    def get_average_authors_per_publication(self, av):
         header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
+        return (header, self._get_authors_per_publication_row(av))
 
-        pub_per_auth = np.zeros((len(self.authors), 4))
-
-        for p in self.publications:
-            for a in p.authors:
-                pub_per_auth[a, p.pub_type] += 1
-
-        func = Stat.FUNC[av]
-
-        data = [ func(pub_per_auth[:, i]) for i in np.arange(4) ] + [ func(pub_per_auth.sum(axis=1)) ]
-        return (header, data)
+    @cached
+    def get_average_publications_per_author(self, av):
+        header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
+        return (header, self._get_average_row(av, "publications_per_author"))
 
+    @cached
     def get_average_publications_in_a_year(self, av):
         header = ("Conference Paper",
             "Journal", "Book", "Book Chapter", "All Publications")
+        return (header, self._get_average_row(av, "publications_in_a_year"))
 
-        ystats = np.zeros((int(self.max_year) - int(self.min_year) + 1, 4))
-
-        for p in self.publications:
-            ystats[p.year - self.min_year][p.pub_type] += 1
-
-        func = Stat.FUNC[av]
-
-        data = [ func(ystats[:, i]) for i in np.arange(4) ] + [ func(ystats.sum(axis=1)) ]
-        return (header, data)
-
+    @cached
     def get_average_authors_in_a_year(self, av):
         header = ("Conference Paper",
             "Journal", "Book", "Book Chapter", "All Publications")
+        return (header, self._get_average_row(av, "authors_in_a_year"))
 
-        yauth = [ [set(), set(), set(), set(), set()] for _ in range(int(self.min_year), int(self.max_year) + 1) ]
-
-        for p in self.publications:
-            for a in p.authors:
-                yauth[p.year - self.min_year][p.pub_type].add(a)
-                yauth[p.year - self.min_year][4].add(a)
-
-        ystats = np.array([ [ len(S) for S in y ] for y in yauth ])
-
-        func = Stat.FUNC[av]
-
-        data = [ func(ystats[:, i]) for i in np.arange(5) ]
-        return (header, data)
-
+    '''
+    All the tables of the averages page, from a single pass over the data.
+    return: (header, tables) where tables lists (title, rows) pairs with a
+        row per statistic: its name, then the statistic for each
+        publication type and for all publications.
+    '''
+    @cached
+    def get_averages_summary(self):
+        header = ("Conference Paper", "Journal", "Book", "Book Chapter", "All Publications")
+        averages = [ Stat.MEAN, Stat.MEDIAN, Stat.MODE ]
+        tables = [
+            ("Average Authors per Publication", [ [Stat.STR[av]]
+                + self._get_authors_per_publication_row(av) for av in averages ]) ]
+        for title, name in [
+                ("Average Publications per Author", "publications_per_author"),
+                ("Average Publications in a Year", "publications_in_a_year"),
+                ("Average Authors in a Year", "authors_in_a_year")]:
+            tables.append((title, [ [Stat.STR[av]] + self._get_average_row(av, name)
+                for av in averages ]))
+        return (header, tables)
+
+    @cached
     def get_publication_summary_average(self, av):
         header = ("Details", "Conference Paper",
             "Journal", "Book", "Book Chapter", "All Publications")
 
-        pub_per_auth = np.zeros((len(self.authors), 4))
-        auth_per_pub = [[], [], [], []]
-
-        for p in self.publications:
-            auth_per_pub[p.pub_type].append(len(p.authors))
-            for a in p.authors:
-                pub_per_auth[a, p.pub_type] += 1
-
         name = Stat.STR[av]
-        func = Stat.FUNC[av]
 
         data = [
             [name + " authors per publication"]
-                + [ func(auth_per_pub[i]) for i in np.arange(4) ]
-                + [ func(list(itertools.chain(*auth_per_pub))) ],
+                + self._get_authors_per_publication_row(av),
             [name + " publications per author"]
-                + [ func(pub_per_auth[:, i]) for i in np.arange(4) ]
-                + [ func(pub_per_auth.sum(axis=1)) ] ]
+                + self._get_average_row(av, "publications_per_author") ]
         return (header, data)
 
-    def get_publication_summary(self):
+    '''
+    approximate: estimate the numbers of authors with HyperLogLog sketches
+    '''
+    @cached
+    def get_publication_summary(self, approximate=False):
         header = ("Details", "Conference Paper",
             "Journal", "Book", "Book Chapter", "Total")
 
-        plist = [0, 0, 0, 0]
-        alist = [set(), set(), set(), set()]
-
-        for p in self.publications:
-            plist[p.pub_type] += 1
-            for a in p.authors:
-                alist[p.pub_type].add(a)
-        # create union of all authors
-        ua = alist[0] | alist[1] | alist[2] | alist[3]
+        pub_types, _, _, _ = self._get_columns()
+        plist = np.bincount(pub_types, minlength=4).tolist()
+        alist = self._count_distinct_authors(pub_types.astype(np.int64), 1,
+            approximate)[0].tolist()
 
         data = [
             ["Number of publications"] + plist + [sum(plist)],
-            ["Number of authors"] + [ len(a) for a in alist ] + [len(ua)] ]
+            ["Number of authors"] + alist ]
         return (header, data)
 
+    '''
+    The iter_* methods yield the rows of the matching get_* table one at a
+    time. They all take:
+        sort: index of the column to order the rows by, None keeps the
+            natural (author id) order
+        reverse: sort in descending order
+        offset, limit: skip the first offset rows and yield at most limit
+    '''
+    def _select_rows(self, n, key, reverse, offset, limit):
+        if key == None:
+            ids = xrange(n)
+        else:
+            ids = sorted(xrange(n), key=key, reverse=reverse)
+        end = None
+        if limit != None:
+            end = offset + limit
+        return itertools.islice(ids, offset, end)
+
+    # accumulators of the author counts of an author's publications, by type
+    def _get_authors_per_publication_of_author(self, av, author_id):
+        accs = [ Stat.ACC[av]() for _ in range(4) ]
+        for p in self._get_author_publications(author_id):
+            # an author listed twice on a publication counts twice
+            accs[p.pub_type].push(len(p.authors), p.authors.count(author_id))
+        return accs
+
+    def iter_average_authors_per_publication_by_author(self, av, sort=None,
+            reverse=False, offset=0, limit=None):
+        def row(i):
+            astats = self._get_authors_per_publication_of_author(av, i)
+            return ([self.authors[i].name]
+                + [ acc.finalize() for acc in astats ]
+                + [ self._merge_accumulators(av, astats).finalize() ])
+
+        if sort == None or sort == 0:
+            key = None
+            if sort == 0:
+                key = lambda i: self.authors[i].name
+            for i in self._select_rows(len(self.authors), key, reverse, offset, limit):
+                yield row(i)
+        else:
+            # the statistics have to be computed before they can be sorted
+            rows = [ row(i) for i in xrange(len(self.authors)) ]
+            key = lambda i: rows[i][sort]
+            for i in self._select_rows(len(rows), key, reverse, offset, limit):
+                yield rows[i]
+
+    @cached
     def get_average_authors_per_publication_by_author(self, av):
         header = ("Author", "Number of conference papers",
             "Number of journals", "Number of books",
             "Number of book chapers", "All publications")
 
-        astats = [ [[], [], [], []] for _ in range(len(self.authors)) ]
-        for p in self.publications:
-            for a in p.authors:
-                astats[a][p.pub_type].append(len(p.authors))
-
-        func = Stat.FUNC[av]
-
-        data = [ [self.authors[i].name]
-            + [ func(L) for L in astats[i] ]
-            + [ func(list(itertools.chain(*astats[i]))) ]
-            for i in range(len(astats)) ]
+        data = list(self.iter_average_authors_per_publication_by_author(av))
         return (header, data)
 
-
+    # integer matrix of publication counts, one row per author and type
+    @cached
+    def _get_publication_counts_by_author(self):
+        pub_types, _, author_ids, offsets = self._get_columns()
+        types = np.repeat(pub_types.astype(np.int64), np.diff(offsets))
+        counts = np.bincount(author_ids.astype(np.int64) * 4 + types,
+            minlength=len(self.authors) * 4)
+        return counts.reshape((len(self.authors), 4))
+
+    def iter_publications_by_author(self, sort=None, reverse=False, offset=0, limit=None):
+        astats = self._get_publication_counts_by_author()
+
+        def row(i):
+            author = self.authors[i]
+            counts = astats[i].tolist()
+            return [author.last_name, author.first_name] + counts + [sum(counts)]
+
+        key = None
+        if sort == 0:
+            key = lambda i: self.authors[i].last_name
+        elif sort == 1:
+            key = lambda i: self.authors[i].first_name
+        elif sort != None:
+            column = astats.sum(axis=1) if sort == 6 else astats[:, sort - 2]
+            key = column.__getitem__
+        for i in self._select_rows(len(self.authors), key, reverse, offset, limit):
+            yield row(i)
+
+    @cached
     def get_publications_by_author(self):
-        header = ("Author Last Name","Author First Name" ,"Number of conference papers",
-            "Number of journals", "Number of books",
-            "Number of book chapers", "Total")
+        data = list(self.iter_publications_by_author())
+        return (PUBLICATIONS_BY_AUTHOR_HEADER, data)
+
+    # ids of the k largest non zero counts, largest first and ties by id,
+    # selected by np.argpartition in time linear in the number of counts
+    def _select_top(self, counts, k):
+        n = len(counts)
+        ids = np.flatnonzero(counts)
+        if k <= 0:
+            return []
+        # one key orders by count, then by lower id
+        keys = counts[ids].astype(np.int64) * n + (n - 1 - ids)
+        if k < len(ids):
+            top = np.argpartition(-keys, k - 1)[:k]
+            ids = ids[top]
+            keys = keys[top]
+        return ids[np.argsort(-keys)].tolist()
 
-        astats = [ [0, 0, 0, 0] for _ in range(len(self.authors)) ]
-        for p in self.publications:
-            for a in p.authors:
-                astats[a][p.pub_type] += 1
-        
-        data = [ [self.authors[i].name.split()[-1]]+[' '.join(self.authors[i].name.split()[0:len(self.authors[i].name.split())-1])] + astats[i] + [sum(astats[i])]
-            for i in range(len(astats)) ]
-        return (header, data)
+    '''
+    The k authors with the most publications, most first; ties are broken
+    by author id. Publications are counted as in the publications by
+    author table, only those of type pub_type (4 for all) from start_year
+    to end_year (None for no bound).
+    return: (header, rows) with a row [name, publications] per author
+    '''
+    @cached
+    def get_top_authors(self, k, pub_type=4, start_year=None, end_year=None):
+        header = ("Author", "Number of publications")
+
+        if start_year == None and end_year == None:
+            counts = self._get_publication_counts_by_author()
+            if pub_type == 4:
+                counts = counts.sum(axis=1)
+            else:
+                counts = counts[:, pub_type]
+        else:
+            pub_types, years, author_ids, offsets = self._get_columns()
+            selected = np.ones(len(years), dtype=bool)
+            if pub_type != 4:
+                selected &= pub_types == pub_type
+            if start_year != None:
+                selected &= years >= start_year
+            if end_year != None:
+                selected &= years <= end_year
+            counts = np.bincount(author_ids[np.repeat(selected, np.diff(offsets))],
+                minlength=len(self.authors))
+
+        return (header, [ [self.authors[i].name, int(counts[i])]
+            for i in self._select_top(counts, k) ])
     
     '''
     arg: string representing the author name
@@ -270,12 +849,17 @@ class Database:
     def get_publications_by_author_name(self, author_name):
         idx = self.author_idx.get(author_name)  # get the id of the author
         astats =  [0, 0, 0, 0]
-        for p in self.publications:
-            if idx in p.authors:
-                    astats[p.pub_type] += 1
+        if idx == None:
+            return astats + [0]
+        if self.author_summary is not None:
+            astats = self._get_summary_columns(idx, AuthorSummary.PUBLICATIONS)
+            return astats + [sum(astats)]
+        for p in self._get_author_publications(idx):
+            astats[p.pub_type] += 1
         return astats + [sum(astats)]
    
 
+    @cached
     def get_average_authors_per_publication_by_year(self, av):
         header = ("Year", "Conference papers",
             "Journals", "Books",
@@ -284,19 +868,18 @@ class Database:
         ystats = {}
         for p in self.publications:
             try:
-                ystats[p.year][p.pub_type].append(len(p.authors))
+                ystats[p.year][p.pub_type].push(len(p.authors))
             except KeyError:
-                ystats[p.year] = [[], [], [], []]
-                ystats[p.year][p.pub_type].append(len(p.authors))
-
-        func = Stat.FUNC[av]
+                ystats[p.year] = [ Stat.ACC[av]() for _ in range(4) ]
+                ystats[p.year][p.pub_type].push(len(p.authors))
 
         data = [ [y]
-            + [ func(L) for L in ystats[y] ]
-            + [ func(list(itertools.chain(*ystats[y]))) ]
+            + [ acc.finalize() for acc in ystats[y] ]
+            + [ self._merge_accumulators(av, ystats[y]).finalize() ]
             for y in ystats ]
         return (header, data)
 
+    @cached
     def get_publications_by_year(self):
         header = ("Year", "Number of conference papers",
             "Number of journals", "Number of books",
@@ -313,58 +896,88 @@ class Database:
         data = [ [y] + ystats[y] + [sum(ystats[y])] for y in ystats ]
         return (header, data)
 
+    '''
+    return: a dict from each year to its rank among the distinct years. The
+        by-year tables list their rows in its iteration order: that of a
+        dict filled with the years in order of first appearance, as they
+        always have.
+    '''
+    def _get_year_order(self):
+        _, years, _, _ = self._get_columns()
+        year_list, first = np.unique(years, return_index=True)
+        year_rank = {}
+        for rank in np.argsort(first, kind="mergesort").tolist():
+            year_rank[int(year_list[rank])] = rank
+        return year_rank
+
+    @cached
     def get_average_publications_per_author_by_year(self, av):
         header = ("Year", "Conference papers",
             "Journals", "Books",
             "Book chapers", "All publications")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                s = ystats[p.year]
-            except KeyError:
-                s = np.zeros((len(self.authors), 4))
-                ystats[p.year] = s
-            for a in p.authors:
-                s[a][p.pub_type] += 1
-
-        func = Stat.FUNC[av]
+        pub_types, years, author_ids, offsets = self._get_columns()
+        na = len(self.authors)
+        lengths = np.diff(offsets)
+
+        year_list = np.unique(years)
+        year_rank = self._get_year_order()
+
+        # count every (year, column, author) triple that occurs; column 4
+        # is all publication types. The implicit zero counts of the other
+        # authors are added by _accumulate_sparse.
+        ranks = np.repeat(np.searchsorted(year_list, years), lengths)
+        types = np.repeat(pub_types.astype(np.int64), lengths)
+        authors = author_ids.astype(np.int64)
+        keys = np.concatenate(((ranks * 5 + types) * na + authors,
+                               (ranks * 5 + 4) * na + authors))
+        keys, counts = np.unique(keys, return_counts=True)
+        cells = keys // na
+        bounds = np.searchsorted(cells, np.arange(len(year_list) * 5 + 1))
+        authors = keys % na
+        counts = counts.astype(float)
 
-        data = [ [y]
-            + [ func(ystats[y][:, i]) for i in np.arange(4) ]
-            + [ func(ystats[y].sum(axis=1)) ]
-            for y in ystats ]
+        data = []
+        for year, rank in year_rank.iteritems():
+            row = [year]
+            for cell in range(rank * 5, rank * 5 + 5):
+                start, end = bounds[cell], bounds[cell + 1]
+                acc = self._accumulate_sparse(av, authors[start:end], counts[start:end], na)
+                row.append(acc.finalize())
+            data.append(row)
         return (header, data)
 
-    def get_author_totals_by_year(self):
+    '''
+    approximate: estimate the numbers of authors with HyperLogLog sketches
+    '''
+    @cached
+    def get_author_totals_by_year(self, approximate=False):
         header = ("Year", "Number of conference papers",
             "Number of journals", "Number of books",
             "Number of book chapers", "Total")
 
-        ystats = {}
-        for p in self.publications:
-            try:
-                s = ystats[p.year][p.pub_type]
-            except KeyError:
-                ystats[p.year] = [set(), set(), set(), set()]
-                s = ystats[p.year][p.pub_type]
-            for a in p.authors:
-                s.add(a)
-        data = [ [y] + [len(s) for s in ystats[y]] + [len(ystats[y][0] | ystats[y][1] | ystats[y][2] | ystats[y][3])]
-            for y in ystats ]
+        counts = self._get_distinct_authors_by_year(approximate)
+        data = [ [year] + counts[year - self.min_year].tolist()
+            for year in self._get_year_order() ]
         return (header, data)
 
-    def _get_collaborations(self, author_id, include_self):
+    # only the publications of type pub_type (4 for all) from start_year to
+    # end_year (None for no bound) are counted
+    def _get_collaborations(self, author_id, include_self, pub_type=4,
+            start_year=None, end_year=None):
         data = {}
-        for p in self.publications:
-            if author_id in p.authors:
-                for a in p.authors:
-                    try:
-                        data[a] += 1
-                    except KeyError:
-                        data[a] = 1
+        for p in self._get_author_publications(author_id):
+            if ((pub_type != 4 and p.pub_type != pub_type) or
+                (start_year != None and p.year < start_year) or
+                (end_year != None and p.year > end_year)):
+                continue
+            for a in p.authors:
+                try:
+                    data[a] += 1
+                except KeyError:
+                    data[a] = 1
         if not include_self:
-            del data[author_id]
+            data.pop(author_id, None)
         return data
     
     '''
@@ -378,19 +991,74 @@ class Database:
         author_id = self.author_idx[name]
         data = self._get_collaborations(author_id, True)
         return [ (self.authors[key].name, data[key]) for key in data ]
+
+    '''
+    The k co-authors an author has the most publications with, most
+    first; ties are broken by author id. pub_type (4 for all), start_year
+    and end_year (None for no bound) restrict the publications counted.
+    return: (header, rows) with a row [name, publications together] per
+        co-author
+    '''
+    def get_top_coauthors(self, name, k, pub_type=4, start_year=None, end_year=None):
+        header = ("Co-Author", "Number of publications together")
+        data = self._get_collaborations(self.author_idx[name], False,
+            pub_type, start_year, end_year)
+        top = heapq.nlargest(k, data.iteritems(), key=lambda item: (item[1], -item[0]))
+        return (header, [ [self.authors[a].name, count] for a, count in top ])
         
         
+    '''
+    return: the sorted array of the a * na + a2 keys of the distinct (a, a2)
+        author id pairs with a < a2 that share a publication. Every author
+        occurrence is paired with the later occurrences of its publication,
+        about COAUTHOR_CHUNK pairs at a time.
+    '''
+    def _get_coauthor_keys(self):
+        _, _, author_ids, offsets = self._get_columns()
+        na = len(self.authors)
+        lengths = np.diff(offsets)
+        # pairs of each occurrence: the occurrences after it in its publication
+        position = np.arange(len(author_ids)) - np.repeat(offsets[:-1], lengths)
+        later = np.repeat(lengths, lengths) - 1 - position
+        pairs = np.cumsum(later)
+
+        keys = [ np.zeros(0, dtype=np.int64) ]
+        start = 0
+        while start < len(later):
+            before = pairs[start - 1] if start > 0 else 0
+            end = max(start + 1, np.searchsorted(pairs, before + COAUTHOR_CHUNK, side="right"))
+            counts = later[start:end]
+            left = np.repeat(np.arange(start, end), counts)
+            right = left + 1 + np.arange(len(left)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+            a = author_ids[left].astype(np.int64)
+            a2 = author_ids[right].astype(np.int64)
+            linked = a != a2
+            keys.append(np.unique(np.minimum(a, a2)[linked] * na + np.maximum(a, a2)[linked]))
+            start = end
+        return np.unique(np.concatenate(keys))
+
+    # number of distinct co-authors of every author
+    def _get_coauthor_counts(self, keys):
+        na = len(self.authors)
+        return (np.bincount(keys // na, minlength=na)
+            + np.bincount(keys % na, minlength=na))
+
+    '''
+    return: a tuple (nodes, links) describing the co-authorship graph.
+        nodes[i] is [name, number of co-authors] for author id i,
+        links is a set of (a, a2) author id pairs with a < a2.
+    Built in a single pass over the publications, so the cost is the sum
+    of the squared author list lengths rather than authors x publications.
+    '''
+    @cached
     def get_network_data(self):
+        keys = self._get_coauthor_keys()
+        degree = self._get_coauthor_counts(keys).tolist()
         na = len(self.authors)
+        links = set(itertools.izip((keys // na).tolist(), (keys % na).tolist()))
 
-        nodes = [ [self.authors[i].name, -1] for i in range(na) ]
-        links = set()
-        for a in range(na):
-            collab = self._get_collaborations(a, False)
-            nodes[a][1] = len(collab)
-            for a2 in collab:
-                if a < a2:
-                    links.add((a, a2))
+        nodes = [ [self.authors[i].name, degree[i]] for i in range(len(self.authors)) ]
         return (nodes, links)
 
     '''
@@ -398,13 +1066,13 @@ class Database:
     return: An integer representing number of times an author appears fist. Or None
     '''
     def get_times_author_appears_first(self, author):
-        if not author in self.author_idx.keys():
+        if not author in self.author_idx:
             return None
                 
         times = 0
         idx = self.author_idx.get(author)  # get the id of the author
         
-        for pub in self.publications:
+        for pub in self._get_author_publications(idx):
             # authors in pub are stored in the way they appeared in papaer
             # So we get the author at the 1st index
             if  idx == pub.authors[0] and len(pub.authors) > 1 :
@@ -416,13 +1084,13 @@ class Database:
     return: An integer representing number of times an author appears last. Or None
     '''  
     def get_times_author_appears_last(self, author):
-        if not author in self.author_idx.keys():
+        if not author in self.author_idx:
             return None
         
         times = 0
         idx = self.author_idx.get(author)  # get the id of the author
 
-        for pub in self.publications:
+        for pub in self._get_author_publications(idx):
             if  idx == pub.authors[-1] and len(pub.authors) > 1:
                 times = times + 1
         return times 
@@ -432,13 +1100,13 @@ class Database:
     return: An integer representing number of times an author appears sole. Or None
     '''
     def get_times_author_appears_sole(self,author):
-        if not author in self.author_idx.keys():
+        if not author in self.author_idx:
             return None
             
         times = 0
         idx = self.author_idx.get(author)  # get the id of the author
         
-        for pub in self.publications:
+        for pub in self._get_author_publications(idx):
             if len(pub.authors) == 1 and idx == pub.authors[-1]:
                 times = times + 1
         return times
@@ -451,21 +1119,114 @@ class Database:
         stats = [[0, 0, 0, 0, 0] for i in range(0, 3)]
         
         idx = self.author_idx.get(author)
+        if idx == None:
+            return stats
+        if self.author_summary is not None:
+            groups = [AuthorSummary.FIRST, AuthorSummary.LAST, AuthorSummary.SOLE]
+            for i in range(0, 3):
+                stats[i] = self._get_summary_columns(idx, groups[i])
+                stats[i].append(sum(stats[i]))
+            return stats
         
-        for pub in self.publications:
-            if idx in pub.authors:
-                if len(pub.authors) > 1:
-                    if idx == pub.authors[0]:
-                        stats[0][pub.pub_type] += 1
-                        stats[0][4] += 1
-                    elif idx == pub.authors[-1]:
-                        stats[1][pub.pub_type] += 1
-                        stats[1][4] += 1
-                else:
-                    stats[2][pub.pub_type] += 1
-                    stats[2][4] += 1
+        for pub in self._get_author_publications(idx):
+            if len(pub.authors) > 1:
+                if idx == pub.authors[0]:
+                    stats[0][pub.pub_type] += 1
+                    stats[0][4] += 1
+                elif idx == pub.authors[-1]:
+                    stats[1][pub.pub_type] += 1
+                    stats[1][4] += 1
+            else:
+                stats[2][pub.pub_type] += 1
+                stats[2][4] += 1
         return stats
         
+    '''
+    Fills self.author_summary, a dense table with one row per author id and
+    the AuthorSummary columns: publications, times first, times last and
+    times sole per publication type, and the number of distinct co-authors.
+    Once built, the per-author queries read their answers from it and
+    add_publication keeps it up to date.
+    '''
+    def build_author_summary(self):
+        pub_types, _, author_ids, offsets = self._get_columns()
+        na = len(self.authors)
+        lengths = np.diff(offsets)
+        types = pub_types.astype(np.int64)
+        summary = np.zeros((na, AuthorSummary.COLUMNS), dtype=np.int64)
+
+        def count(group, authors, types):
+            cells = authors.astype(np.int64) * 4 + types
+            summary[:, group:group + 4] = np.bincount(cells, minlength=na * 4).reshape((na, 4))
+
+        # an author listed twice on a publication is counted once
+        pub_ids = np.repeat(np.arange(len(lengths)), lengths)
+        pairs = np.unique(pub_ids * na + author_ids)
+        count(AuthorSummary.PUBLICATIONS, pairs % na, types[pairs // na])
+
+        multi = np.flatnonzero(lengths > 1)
+        first = author_ids[offsets[multi]]
+        last = author_ids[offsets[multi + 1] - 1]
+        count(AuthorSummary.FIRST, first, types[multi])
+        # the first author is not also counted as last
+        count(AuthorSummary.LAST, last[last != first], types[multi][last != first])
+        sole = np.flatnonzero(lengths == 1)
+        count(AuthorSummary.SOLE, author_ids[offsets[sole]], types[sole])
+
+        summary[:, AuthorSummary.COAUTHORS] = self._get_coauthor_counts(self._get_coauthor_keys())
+        self.author_summary = summary
+
+    def _get_summary_columns(self, author_id, group):
+        return self.author_summary[author_id, group:group + 4].tolist()
+
+    # adds publication pub_id, already indexed in author_pubs, to author_summary
+    def _update_author_summary(self, pub_id, pub):
+        na = len(self.authors)
+        if na > len(self.author_summary):
+            grown = np.zeros((max(na, 2 * len(self.author_summary)), AuthorSummary.COLUMNS),
+                dtype=np.int64)
+            grown[:len(self.author_summary)] = self.author_summary
+            self.author_summary = grown
+
+        summary = self.author_summary
+        authors = pub.authors
+        t = pub.pub_type
+        ids = set(authors)
+        for a in ids:
+            summary[a, AuthorSummary.PUBLICATIONS + t] += 1
+            # co-authors this publication adds to the ones a already had
+            known = set()
+            for i in self.author_pubs[a]:
+                if i != pub_id:
+                    known.update(self.publications[i].authors)
+            summary[a, AuthorSummary.COAUTHORS] += len(ids - known - set([a]))
+        if len(authors) > 1:
+            summary[authors[0], AuthorSummary.FIRST + t] += 1
+            if authors[-1] != authors[0]:
+                summary[authors[-1], AuthorSummary.LAST + t] += 1
+        else:
+            summary[authors[0], AuthorSummary.SOLE + t] += 1
+
+    '''
+    return: the names of up to k authors whose name, or any word of it,
+        starts with query, ignoring case and accents
+    '''
+    def search_authors(self, query, k=10):
+        if self.name_index == None:
+            self.name_index = NameIndex([ a.name for a in self.authors ])
+        return [ self.authors[i].name for i in self.name_index.search(query, k) ]
+
+    '''
+    return: the number of distinct co-authors of the author, 0 if unknown
+    '''
+    def get_coauthor_count(self, author):
+        idx = self.author_idx.get(author)
+        if idx == None:
+            return 0
+        if self.author_summary is not None:
+            return int(self.author_summary[idx, AuthorSummary.COAUTHORS])
+        return len(self._get_collaborations(idx, False))
+
 class DocumentHandler(handler.ContentHandler):
     TITLE_TAGS = [ "sub", "sup", "i", "tt", "ref" ]
     PUB_TYPE = {
@@ -485,6 +1246,7 @@ class DocumentHandler(handler.ContentHandler):
         self.authors = []
         self.year = None
         self.title = None
+        self.key = None
 
     def startDocument(self):
         pass
@@ -495,8 +1257,9 @@ class DocumentHandler(handler.ContentHandler):
     def startElement(self, name, attrs):
         if name in self.TITLE_TAGS:
             return
-        if name in DocumentHandler.PUB_TYPE.keys():
+        if name in DocumentHandler.PUB_TYPE:
             self.pub_type = DocumentHandler.PUB_TYPE[name]
+            self.key = attrs.get("key")
         self.tag = name
         self.chrs = ""
 
@@ -505,23 +1268,92 @@ class DocumentHandler(handler.ContentHandler):
             return
         if name in self.TITLE_TAGS:
             return
-        d = self.chrs.strip()
+        self.endField(name, self.chrs.strip())
+        self.chrs = ""
+
+    def endField(self, name, d):
         if self.tag == "author":
             self.authors.append(d)
         elif self.tag == "title":
             self.title = d
         elif self.tag == "year":
             self.year = int(d)
-        elif name in DocumentHandler.PUB_TYPE.keys():
+        elif name in DocumentHandler.PUB_TYPE:
             self.db.add_publication(
                 self.pub_type,
                 self.title,
                 self.year,
-                self.authors)
+                self.authors,
+                self.key)
             self.clearData()
         self.tag = None
-        self.chrs = ""
 
     def characters(self, chrs):
         if self.pub_type != None:
             self.chrs += chrs
+
+class ExpatDocumentHandler(DocumentHandler):
+    '''
+    DocumentHandler driven directly by xml.parsers.expat rather than through
+    xml.sax. Expat buffers character data, the handler collects the chunks
+    in a list and joins them once per element, and tag lookups use a
+    frozenset. It makes exactly the same add_publication calls.
+    '''
+    TITLE_TAGS = frozenset(DocumentHandler.TITLE_TAGS)
+
+    def __init__(self, db):
+        DocumentHandler.__init__(self, db)
+        self.chrs = []
+
+    '''
+    args: an open XML file and its absolute path, against which external
+        entities such as the DBLP DTD are resolved (as xml.sax does).
+    raises: expat.ExpatError if the document is not well formed.
+    '''
+    def parse(self, infile, base):
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.buffer_size = 1 << 16
+        parser.SetBase(base)
+        parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_UNLESS_STANDALONE)
+
+        def external_entity_ref(context, base, sysid, pubid):
+            try:
+                entity = open(os.path.join(os.path.dirname(base or ""), sysid), "rb")
+            except IOError:
+                return 0
+            try:
+                parser.ExternalEntityParserCreate(context).ParseFile(entity)
+            except expat.ExpatError:
+                return 0
+            finally:
+                entity.close()
+            return 1
+
+        parser.ExternalEntityRefHandler = external_entity_ref
+        parser.StartElementHandler = self.startElement
+        parser.EndElementHandler = self.endElement
+        parser.CharacterDataHandler = self.characters
+        parser.ParseFile(infile)
+
+    def startElement(self, name, attrs):
+        if name in self.TITLE_TAGS:
+            return
+        pub_type = self.PUB_TYPE.get(name)
+        if pub_type != None:
+            self.pub_type = pub_type
+            self.key = attrs.get("key")
+        self.tag = name
+        self.chrs = []
+
+    def endElement(self, name):
+        if self.pub_type == None:
+            return
+        if name in self.TITLE_TAGS:
+            return
+        self.endField(name, "".join(self.chrs).strip())
+        self.chrs = []
+
+    def characters(self, chrs):
+        if self.pub_type != None:
+            self.chrs.append(chrs)
@@ -0,0 +1,56 @@
+'''
+Set of the DBLP record keys ("journals/tods/CeriF97") of the loaded
+publications, used to skip records that are already loaded when an update
+file is appended.
+
+Keys are stored as 63 bit hashes rather than strings: a sorted int64 array,
+which can be memory mapped from a snapshot and is searched by bisection,
+plus a set of the keys added since the array was last built. The hash is
+63 bits of the key's MD5 digest, which spreads even short, similar keys
+evenly, so among n keys the chance that two share a hash is about
+n * n / 2**64: 5e-6 for ten million keys. Two keys sharing a hash would
+make the second publication be skipped as a duplicate.
+'''
+import hashlib
+import struct
+
+import numpy as np
+
+def key_hash(key):
+    if isinstance(key, unicode):
+        key = key.encode("utf-8")
+    return struct.unpack("<Q", hashlib.md5(key).digest()[:8])[0] & 0x7fffffffffffffff
+
+class KeyIndex:
+    '''
+    hashes: a sorted int64 array of key hashes, as returned by hashes()
+    '''
+    def __init__(self, hashes=None):
+        if hashes is None:
+            hashes = np.zeros(0, dtype=np.int64)
+        self.sorted = hashes
+        self.added = set()
+
+    def __contains__(self, key):
+        h = key_hash(key)
+        if h in self.added:
+            return True
+        i = np.searchsorted(self.sorted, h)
+        return i < len(self.sorted) and self.sorted[i] == h
+
+    def __len__(self):
+        return len(self.sorted) + len(self.added)
+
+    def add(self, key):
+        self.added.add(key_hash(key))
+
+    def hashes(self):
+        '''
+        return: the sorted array of all the key hashes. The keys added so
+            far are merged into it, which keeps later lookups fast.
+        '''
+        if len(self.added) > 0:
+            added = np.fromiter(self.added, dtype=np.int64, count=len(self.added))
+            self.sorted = np.union1d(self.sorted, added)
+            self.added = set()
+        return self.sorted
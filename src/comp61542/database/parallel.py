@@ -0,0 +1,222 @@
+'''
+Multi-process parsing of large DBLP files.
+
+The body of the file is cut into byte ranges at top-level record
+boundaries. Every range is wrapped in the file's own header (XML
+declaration, DOCTYPE, root start tag) and footer and parsed by
+ExpatDocumentHandler in a worker process, which builds the columns of its
+shard with author ids local to the shard. The parent merges the shards in
+file order: it maps every shard's authors to global ids, numbering new
+authors in order of first appearance, drops records whose key an earlier
+shard already added, and concatenates the columns. Author ids, warnings
+and the publications are exactly those of a sequential read, and the
+parent's work is proportional to the number of distinct authors per shard
+rather than to the number of records.
+'''
+import mmap
+import multiprocessing
+import os
+import re
+from cStringIO import StringIO
+
+import numpy as np
+
+from comp61542.database.keys import key_hash
+
+# top-level elements of data/dblp.dtd
+RECORD_TAG = re.compile(r"<(?:article|inproceedings|proceedings|book|"
+                        r"incollection|phdthesis|mastersthesis|www)[\s>/]")
+# shards are only cut where a record starts on a new line
+RECORD_START = re.compile(r"\n[ \t]*" + RECORD_TAG.pattern)
+
+class ParseError(Exception):
+    pass
+
+# the key hash of records without a key; real hashes are not negative
+NO_KEY = -1
+
+class _Shard:
+    '''
+    Stands in for the Database while a shard is parsed. It applies the
+    checks of Database.add_publication, but keeps the warnings, tagged
+    with the record's key hash, for the parent to print: a record whose
+    key an earlier shard added is skipped silently.
+    '''
+    def __init__(self):
+        self.names = []
+        self.author_idx = {}
+        self.pub_types = []
+        self.years = []
+        self.lengths = []
+        self.author_ids = []
+        self.titles = []
+        self.hashes = []
+        self.keys = set()
+        self.warnings = []
+
+    def add_publication(self, pub_type, title, year, authors, key=None):
+        # imported here to avoid a circular import with the database module
+        from comp61542.database.database import (exclusion_warning, missing_title_warning)
+
+        h = NO_KEY
+        if key != None:
+            h = key_hash(key)
+            if h in self.keys:
+                return
+        if year == None or len(authors) == 0:
+            self.warnings.append((h, exclusion_warning(pub_type, title, year, authors)))
+            return
+        if title == None:
+            self.warnings.append((h, missing_title_warning(pub_type, year, authors)))
+
+        for a in authors:
+            try:
+                self.author_ids.append(self.author_idx[a])
+            except KeyError:
+                self.author_idx[a] = len(self.names)
+                self.author_ids.append(len(self.names))
+                self.names.append(a)
+        self.pub_types.append(pub_type)
+        self.years.append(int(year))
+        self.lengths.append(len(authors))
+        self.titles.append(title)
+        self.hashes.append(h)
+        if h != NO_KEY:
+            self.keys.add(h)
+
+    def result(self):
+        return (self.names, np.array(self.pub_types, dtype=np.int8),
+            np.array(self.years, dtype=np.int16), np.array(self.author_ids, dtype=np.int32),
+            np.array(self.lengths, dtype=np.int64), self.titles,
+            np.array(self.hashes, dtype=np.int64), self.warnings)
+
+def split(filename, shards):
+    '''
+    return: (header, footer, ranges) where ranges is a list of (start, end)
+        byte offsets of the record data, or None if the file cannot be split.
+    '''
+    f = open(filename, "rb")
+    try:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        f.close()
+    try:
+        first = RECORD_START.search(data)
+        body_end = data.rfind("</")
+        if first == None or body_end < first.start():
+            return None
+        body_start = first.start() + 1
+        header = data[:body_start]
+        footer = data[body_end:]
+        if RECORD_TAG.search(header) != None:
+            # the first record does not start on its own line
+            return None
+
+        bounds = [body_start]
+        step = max(1, (body_end - body_start) / shards)
+        for i in range(1, shards):
+            m = RECORD_START.search(data, max(bounds[-1], body_start + i * step), body_end)
+            if m == None:
+                break
+            if m.start() + 1 > bounds[-1]:
+                bounds.append(m.start() + 1)
+        bounds.append(body_end)
+        return (header, footer, zip(bounds[:-1], bounds[1:]))
+    finally:
+        data.close()
+
+def parse_shard(args):
+    '''
+    Worker entry point. args is (filename, header, footer, start, end).
+    return: the shard's (names, pub_types, years, author_ids, lengths,
+        titles, key hashes, warnings), see _Shard.
+    '''
+    # imported here to avoid a circular import with the database module
+    from comp61542.database.database import ExpatDocumentHandler, expat
+
+    filename, header, footer, start, end = args
+    f = open(filename, "rb")
+    try:
+        f.seek(start)
+        body = f.read(end - start)
+    finally:
+        f.close()
+
+    shard = _Shard()
+    try:
+        ExpatDocumentHandler(shard).parse(StringIO(header + body + footer),
+            os.path.abspath(filename))
+    except expat.ExpatError as e:
+        raise ParseError(expat.ErrorString(e.code))
+    return shard.result()
+
+def _contains(hashes, h):
+    i = np.searchsorted(hashes, h)
+    return i < len(hashes) and hashes[i] == h
+
+def read(filename, processes):
+    '''
+    Parses filename with a pool of processes, printing the warnings of a
+    sequential read.
+    return: (columns, titles, names, key_hashes) as Database.load_columns
+        takes them, or None if the file could not be split into shards, in
+        which case the caller should read it sequentially.
+    raises: ParseError if a shard is not well formed.
+    '''
+    # a few shards per process keeps the workers busy when shards differ in size
+    parts = split(filename, processes * 4)
+    if parts == None:
+        return None
+    header, footer, ranges = parts
+
+    names = []
+    author_idx = {}
+    # key hashes of the publications added so far, sorted
+    added = np.zeros(0, dtype=np.int64)
+    columns = [[], [], [], []]
+    titles = []
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        tasks = [ (filename, header, footer, start, end) for start, end in ranges ]
+        for shard in pool.imap(parse_shard, tasks):
+            shard_names, pub_types, years, author_ids, lengths, shard_titles, hashes, warnings = shard
+            for h, warning in warnings:
+                if h == NO_KEY or not _contains(added, h):
+                    print warning
+
+            keep = (hashes == NO_KEY) | ~np.in1d(hashes, added)
+            if not keep.all():
+                author_ids = author_ids[np.repeat(keep, lengths)]
+                pub_types, years, lengths = pub_types[keep], years[keep], lengths[keep]
+                shard_titles = [ t for t, k in zip(shard_titles, keep.tolist()) if k ]
+                hashes = hashes[keep]
+
+            # global ids of the shard's authors; new ones are numbered in
+            # order of first appearance
+            remap = np.zeros(len(shard_names), dtype=np.int32)
+            local, first = np.unique(author_ids, return_index=True)
+            for i in local[np.argsort(first, kind="mergesort")].tolist():
+                name = shard_names[i]
+                a_id = author_idx.get(name)
+                if a_id == None:
+                    a_id = author_idx[name] = len(names)
+                    names.append(name)
+                remap[i] = a_id
+
+            for column, values in zip(columns, [pub_types, years, remap[author_ids], lengths]):
+                column.append(values)
+            titles.extend(shard_titles)
+            added = np.union1d(added, hashes[hashes != NO_KEY])
+    finally:
+        pool.terminate()
+        pool.join()
+
+    pub_types, years, author_ids, lengths = [
+        np.concatenate([np.zeros(0, dtype=dtype)] + column)
+        for column, dtype in zip(columns, [np.int8, np.int16, np.int32, np.int64]) ]
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return ((pub_types, years, author_ids, offsets), titles, names, added)
@@ -0,0 +1,91 @@
+'''
+Prefix search over author names.
+
+Names are normalized (accents stripped, lower case, single spaces) and kept
+in sorted lists, so all names starting with a query are a contiguous run
+found by bisection. Besides the full names, the index holds every name from
+its second word on, so "berg" also finds "Jan van der Berg". A search
+touches only the entries it returns and a few duplicates, however many
+names there are. Names added later are buffered and merged into the
+sorted lists in one pass before the next search.
+'''
+from bisect import bisect_left
+import unicodedata
+
+def normalize(name):
+    if isinstance(name, str):
+        name = name.decode("utf-8")
+    name = unicodedata.normalize("NFKD", name)
+    name = u"".join(c for c in name if not unicodedata.combining(c))
+    return u" ".join(name.lower().split())
+
+class NameIndex:
+    '''
+    names: the author names, the position of a name is its author id
+    '''
+    def __init__(self, names=[]):
+        full = []
+        words = []
+        for author_id, name in enumerate(names):
+            self._entries(normalize(name), author_id, full, words)
+        full.sort()
+        words.sort()
+        # sorted (normalized name, author id) pairs
+        self.full = full
+        # sorted (normalized name from its second word on, author id) pairs
+        self.words = words
+        # entries added since the last merge, unsorted
+        self.added_full = []
+        self.added_words = []
+
+    def _entries(self, key, author_id, full, words):
+        full.append((key, author_id))
+        start = key.find(u" ")
+        while start >= 0:
+            words.append((key[start + 1:], author_id))
+            start = key.find(u" ", start + 1)
+
+    def add(self, name, author_id):
+        self._entries(normalize(name), author_id, self.added_full, self.added_words)
+
+    '''
+    Merges the names added since the last merge into the sorted lists.
+    Both parts are sorted runs, which list.sort merges in linear time. New
+    lists replace the old ones, so a search running meanwhile is not
+    disturbed.
+    '''
+    def merge(self):
+        if len(self.added_full) > 0:
+            full = self.full + sorted(self.added_full)
+            full.sort()
+            self.added_full = []
+            self.full = full
+        if len(self.added_words) > 0:
+            words = self.words + sorted(self.added_words)
+            words.sort()
+            self.added_words = []
+            self.words = words
+
+    '''
+    return: up to k author ids whose name, or a word of it, starts with
+        query, ignoring case and accents. Names that start with the query
+        come first, each group in alphabetical order.
+    '''
+    def search(self, query, k=10):
+        self.merge()
+        query = normalize(query)
+        found = []
+        seen = set()
+        if k <= 0:
+            return found
+        for entries in [self.full, self.words]:
+            i = bisect_left(entries, (query,))
+            while i < len(entries) and entries[i][0].startswith(query):
+                author_id = entries[i][1]
+                if author_id not in seen:
+                    seen.add(author_id)
+                    found.append(author_id)
+                    if len(found) == k:
+                        return found
+                i += 1
+        return found
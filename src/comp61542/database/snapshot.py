@@ -0,0 +1,153 @@
+'''
+On-disk snapshot of a parsed Database.
+
+A snapshot is a directory holding one .npy file per array, so that every
+array can be memory mapped on load (arrays inside an .npz archive cannot),
+plus a meta.json file recording the format version, the size and mtime of
+the XML file it was built from, the year range, the data version (see
+Database.data_version) and the update files appended to the data.
+Strings are stored as UTF-8 blobs: author names separated by NUL
+characters (which cannot occur in XML text), titles with an offsets array
+so they can be decoded lazily. DBLP keys are stored as the sorted hashes
+of keys.KeyIndex.
+'''
+import json
+import os
+import shutil
+
+import numpy as np
+
+VERSION = 4
+
+ARRAYS = ["pub_types", "years", "author_ids", "offsets",
+          "title_offsets", "title_missing", "titles", "names", "key_hashes"]
+
+class MappedStrings(object):
+    '''
+    List-like view over a UTF-8 blob and an offsets array. Items are decoded
+    on access; strings appended after loading are kept in a plain list.
+    Missing items (None) are flagged in a separate boolean array.
+    '''
+    def __init__(self, blob, offsets, missing):
+        self.blob = blob
+        self.offsets = offsets
+        self.missing = missing
+        self.stored = len(offsets) - 1
+        self.appended = []
+
+    def append(self, s):
+        self.appended.append(s)
+
+    def __len__(self):
+        return self.stored + len(self.appended)
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if idx >= self.stored:
+            return self.appended[idx - self.stored]
+        if self.missing[idx]:
+            return None
+        return self.blob[self.offsets[idx]:self.offsets[idx + 1]].tostring().decode("utf-8")
+
+def _source_stat(source):
+    st = os.stat(source)
+    return { "size":st.st_size, "mtime":st.st_mtime }
+
+def _encode_titles(titles):
+    n = len(titles)
+    missing = np.zeros(n, dtype=np.bool_)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    parts = []
+    end = 0
+    for i in xrange(n):
+        t = titles[i]
+        if t == None:
+            missing[i] = True
+        else:
+            b = t.encode("utf-8")
+            parts.append(b)
+            end += len(b)
+        offsets[i + 1] = end
+    blob = np.frombuffer("".join(parts), dtype=np.uint8)
+    return (blob, offsets, missing)
+
+def save(snapshot_dir, source, columns, titles, names, key_hashes, min_year, max_year,
+        data_version, updates=[]):
+    '''
+    Writes a snapshot of the given columns (see PublicationTable.columns()),
+    titles, author names and key hashes (see KeyIndex.hashes()), with the
+    (path, size, mtime) of the updates appended to them. The snapshot is
+    written next to snapshot_dir first and renamed into place, so readers
+    never see a partial one.
+    '''
+    pub_types, years, author_ids, offsets = columns
+    title_blob, title_offsets, title_missing = _encode_titles(titles)
+    arrays = {
+        "pub_types":pub_types, "years":years,
+        "author_ids":author_ids, "offsets":offsets,
+        "title_offsets":title_offsets, "title_missing":title_missing,
+        "titles":title_blob,
+        "names":np.frombuffer(u"\0".join(names).encode("utf-8"), dtype=np.uint8),
+        "key_hashes":key_hashes }
+    meta = { "version":VERSION, "source":_source_stat(source),
+             "min_year":min_year, "max_year":max_year, "data_version":data_version,
+             "updates":[ list(u) for u in updates ],
+             "publications":len(pub_types), "authors":len(names) }
+
+    tmp_dir = snapshot_dir.rstrip(os.sep) + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for name in ARRAYS:
+        np.save(os.path.join(tmp_dir, name + ".npy"), arrays[name])
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    if os.path.exists(snapshot_dir):
+        shutil.rmtree(snapshot_dir)
+    os.rename(tmp_dir, snapshot_dir)
+
+def is_current(snapshot_dir, source):
+    try:
+        with open(os.path.join(snapshot_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (IOError, ValueError):
+        return False
+    return meta.get("version") == VERSION and meta.get("source") == _source_stat(source)
+
+def _load_array(filename):
+    try:
+        return np.load(filename, mmap_mode="r")
+    except ValueError:
+        # empty arrays cannot be memory mapped
+        return np.load(filename)
+
+def load(snapshot_dir, source):
+    '''
+    return: None if there is no snapshot or it is stale with respect to
+        source, otherwise a dict with the memory mapped "columns", the
+        "titles" (a MappedStrings), the list of author "names", the
+        "key_hashes", "min_year"/"max_year", the "data_version" and the
+        "updates" appended.
+    '''
+    if not is_current(snapshot_dir, source):
+        return None
+    with open(os.path.join(snapshot_dir, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {}
+    for name in ARRAYS:
+        arrays[name] = _load_array(os.path.join(snapshot_dir, name + ".npy"))
+
+    names = []
+    if meta["authors"] > 0:
+        names = arrays["names"].tostring().decode("utf-8").split(u"\0")
+    return {
+        "columns":(arrays["pub_types"], arrays["years"],
+                   arrays["author_ids"], arrays["offsets"]),
+        "titles":MappedStrings(arrays["titles"], arrays["title_offsets"],
+                               arrays["title_missing"]),
+        "names":names,
+        "key_hashes":arrays["key_hashes"],
+        "min_year":meta["min_year"], "max_year":meta["max_year"],
+        "data_version":meta["data_version"],
+        "updates":[ tuple(u) for u in meta.get("updates", []) ] }
@@ -0,0 +1,226 @@
+'''
+Opt-in timing of requests, views, templates and Database queries.
+
+Nothing is wrapped until enable() is called, so the application runs
+exactly as before when instrumentation is off. enable() wraps the
+Database query methods (get_*, iter_*, search_*), the view functions and
+template rendering, times every request until its response has been sent
+(streamed pages included) and adds /debug/metrics, which serves the call
+counts and wall times in the Prometheus text format. Times are inclusive:
+a view's time contains the queries and the rendering it does.
+
+The counters live in the process that serves the request; with the
+pre-forking server each worker reports its own.
+'''
+import cProfile
+import functools
+import itertools
+import os
+import threading
+import time
+import urlparse
+
+from flask import Response
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import ClosingIterator
+
+from comp61542.database import database
+
+# (kind, name) -> [calls, seconds]
+metrics = {}
+lock = threading.Lock()
+enabled = False
+
+def record(kind, name, seconds):
+    with lock:
+        try:
+            m = metrics[(kind, name)]
+        except KeyError:
+            m = metrics[(kind, name)] = [0, 0.0]
+        m[0] += 1
+        m[1] += seconds
+
+def timed(kind, name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(kind, name, time.time() - start)
+    return wrapper
+
+def timed_iter(kind, name, func):
+    # times the generator func returns until it is exhausted, counting only
+    # the time spent producing items
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        spent = [0.0]
+        def timed_items(items):
+            try:
+                while True:
+                    start = time.time()
+                    try:
+                        item = items.next()
+                    finally:
+                        spent[0] += time.time() - start
+                    yield item
+            finally:
+                record(kind, name, spent[0])
+        return timed_items(func(*args, **kwargs))
+    return wrapper
+
+# return: the original methods, by name
+def instrument_class(cls, kind, prefixes):
+    originals = {}
+    for name, func in vars(cls).items():
+        if not name.startswith(prefixes) or not callable(func):
+            continue
+        originals[name] = func
+        if name.startswith("iter_"):
+            setattr(cls, name, timed_iter(kind, name, func))
+        else:
+            setattr(cls, name, timed(kind, name, func))
+    return originals
+
+def instrument_templates(env):
+    original = env.template_class
+
+    class TimedTemplate(original):
+        def render(self, *args, **kwargs):
+            start = time.time()
+            try:
+                return super(TimedTemplate, self).render(*args, **kwargs)
+            finally:
+                record("template", self.name, time.time() - start)
+
+        def generate(self, *args, **kwargs):
+            items = super(TimedTemplate, self).generate
+            return timed_iter("template", self.name, items)(*args, **kwargs)
+
+    def set_template_class(cls):
+        env.template_class = cls
+        # templates loaded so far were built from the other class
+        if env.cache is not None:
+            env.cache.clear()
+
+    set_template_class(TimedTemplate)
+    return lambda: set_template_class(original)
+
+class RequestTimer:
+    '''
+    WSGI middleware timing each request by endpoint. With a profile_dir,
+    requests that have a "profile" query argument are run under cProfile
+    and the stats written to profile_dir/<endpoint>-<n>.prof.
+    '''
+    def __init__(self, app, wsgi_app, profile_dir=None):
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.profile_dir = profile_dir
+        self.profiles = itertools.count(1)
+
+    def endpoint(self, environ):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            endpoint = "unmatched"
+        return endpoint
+
+    def __call__(self, environ, start_response):
+        endpoint = self.endpoint(environ)
+        profiler = None
+        if self.profile_dir != None:
+            query = urlparse.parse_qs(environ.get("QUERY_STRING", ""), True)
+            if "profile" in query:
+                profiler = cProfile.Profile()
+
+        start = time.time()
+        def finish():
+            if profiler != None:
+                profiler.disable()
+                profiler.dump_stats(os.path.join(self.profile_dir,
+                    "%s-%d.prof" % (endpoint, self.profiles.next())))
+            record("request", endpoint, time.time() - start)
+
+        if profiler != None:
+            profiler.enable()
+        try:
+            body = self.wsgi_app(environ, start_response)
+        except:
+            finish()
+            raise
+        return ClosingIterator(body, [finish])
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def prometheus_text(cache_stats=None):
+    with lock:
+        items = sorted((key, list(m)) for key, m in metrics.items())
+    lines = []
+    for metric, column, help in [
+            ("comp61542_calls_total", 0, "Calls of instrumented functions."),
+            ("comp61542_seconds_total", 1, "Wall time spent in instrumented functions, including nested calls.")]:
+        lines.append("# HELP %s %s" % (metric, help))
+        lines.append("# TYPE %s counter" % metric)
+        for (kind, name), m in items:
+            lines.append("%s{kind=\"%s\",name=\"%s\"} %r" % (metric, kind, escape(name), m[column]))
+
+    if cache_stats != None:
+        for key, type in [("hits", "counter"), ("misses", "counter"),
+                          ("evictions", "counter"), ("entries", "gauge"),
+                          ("bytes", "gauge"), ("max_bytes", "gauge")]:
+            metric = "comp61542_cache_" + key
+            if type == "counter":
+                metric += "_total"
+            lines.append("# TYPE %s %s" % (metric, type))
+            lines.append("%s %d" % (metric, cache_stats[key]))
+    return "\n".join(lines) + "\n"
+
+def metrics_view(app):
+    def showMetrics():
+        db = app.config.get('DATABASE')
+        cache = getattr(db, "cache", None)
+        stats = cache.stats() if cache != None else None
+        return Response(prometheus_text(stats),
+            mimetype="text/plain; version=0.0.4")
+    return showMetrics
+
+def enable(app, profile_dir=None):
+    '''
+    Instruments app and the Database class. Call it before serving any
+    request; calls made while instrumentation is on do nothing.
+    profile_dir: where to write the cProfile stats of requests made with
+        a "profile" query argument. Profiling is off when it is None.
+    return: a function turning instrumentation off again, which restores
+        app and Database as they were, or None if it was already on
+    '''
+    global enabled
+    if enabled:
+        return None
+    enabled = True
+
+    methods = instrument_class(database.Database, "database", ("get_", "iter_", "search_"))
+    views = dict(app.view_functions)
+    for endpoint, func in views.items():
+        app.view_functions[endpoint] = timed("view", endpoint, func)
+    restore_templates = instrument_templates(app.jinja_env)
+    wsgi_app = app.wsgi_app
+    app.wsgi_app = RequestTimer(app, wsgi_app, profile_dir)
+    app.add_url_rule("/debug/metrics", "showMetrics", metrics_view(app))
+
+    def disable():
+        global enabled
+        for name, func in methods.items():
+            setattr(database.Database, name, func)
+        app.view_functions.clear()
+        app.view_functions.update(views)
+        restore_templates()
+        app.wsgi_app = wsgi_app
+        # werkzeug has no public way of removing a rule
+        url_map = app.url_map
+        for rule in url_map._rules_by_endpoint.pop("showMetrics"):
+            url_map._rules.remove(rule)
+        url_map._remap = True
+        enabled = False
+    return disable
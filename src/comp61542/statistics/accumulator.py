@@ -0,0 +1,94 @@
+'''
+Streaming versions of average.mean, average.median and average.mode.
+
+Values are pushed one at a time (or as value, count pairs) instead of being
+collected in a list first. Accumulators of the same kind can be merged, so
+partial results computed over separate shards combine into the result for
+the concatenated data. finalize() returns exactly what the matching
+function in average returns for the same values in the same order.
+'''
+from comp61542.statistics import average
+
+class MeanAccumulator:
+    # running sum and count
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def push(self, x, n=1):
+        self.total += x * n
+        self.count += n
+
+    def push_all(self, X):
+        for x in X:
+            self.total += x
+        self.count += len(X)
+
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+        return self
+
+    def finalize(self):
+        if self.count > 0:
+            return float(self.total) / float(self.count)
+        return 0
+
+class HistogramAccumulator:
+    '''
+    Counting histogram of the pushed values. The values here are small
+    integers, so the histogram stays small however many values are pushed.
+    Distinct values are also remembered in order of first appearance, which
+    is what average.mode's tie order depends on.
+    '''
+    def __init__(self):
+        self.counts = {}
+        self.order = []
+        self.count = 0
+
+    def push(self, x, n=1):
+        try:
+            self.counts[x] += n
+        except KeyError:
+            self.counts[x] = n
+            self.order.append(x)
+        self.count += n
+
+    def push_all(self, X):
+        for x in X:
+            self.push(x)
+
+    def merge(self, other):
+        for x in other.order:
+            self.push(x, other.counts[x])
+        return self
+
+class MedianAccumulator(HistogramAccumulator):
+    def finalize(self):
+        n = self.count
+        if n == 0:
+            return 0
+        # the values at sorted positions n / 2 - 1 and n / 2
+        wanted = [(n / 2) - 1, n / 2]
+        found = []
+        seen = 0
+        for x in sorted(self.counts):
+            seen += self.counts[x]
+            while len(found) < 2 and wanted[len(found)] < seen:
+                found.append(x)
+            if len(found) == 2:
+                break
+        if n % 2:
+            return found[1]
+        return average.mean(found)
+
+class ModeAccumulator(HistogramAccumulator):
+    def finalize(self):
+        if self.count == 0:
+            return []
+        # a dict filled in first appearance order iterates like the one
+        # average.mode builds
+        d = {}
+        for x in self.order:
+            d[x] = self.counts[x]
+        return average.mode_of_counts(d)
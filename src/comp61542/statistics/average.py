@@ -1,7 +1,34 @@
 
+import numpy as np
+
+# mean, median and mode hand one dimensional numeric NumPy arrays to
+# vectorized implementations that return exactly what the element by
+# element code does. Set to False to always take the element by element path.
+FAST_PATHS = True
+
+# sums of integer valued floats below this are exact in any order
+EXACT_FLOAT_SUM = 2 ** 53
+
+def _is_vector(X):
+    if not FAST_PATHS or not isinstance(X, np.ndarray) or X.ndim != 1:
+        return False
+    if X.dtype.kind in "iu":
+        return True
+    # sorting and counting NaNs behaves differently in NumPy
+    return X.dtype.kind == "f" and np.isfinite(X).all()
+
+def _has_exact_sum(X):
+    # np.sum adds pairwise rather than left to right, which only gives the
+    # same result when no rounding happens
+    if X.dtype.kind in "iu":
+        return True
+    return (X == np.floor(X)).all() and np.abs(X).sum() < EXACT_FLOAT_SUM
+
 def mean(X):
     n = len(X)
     if n > 0:
+        if _is_vector(X) and _has_exact_sum(X):
+            return float(X.sum()) / float(n)
         return float(sum(X)) / float(len(X))
     return 0
 
@@ -10,6 +37,12 @@ def median(X):
     n = len(X)
     if n == 0:
         return 0
+    if _is_vector(X):
+        # only the one or two middle values have to be in sorted position
+        L = np.partition(X, [(n - 1) / 2, n / 2])
+        if n % 2:
+            return L[n / 2]
+        return mean([L[(n / 2) - 1], L[n / 2]])
     L = sorted(X)
     if n % 2:
         return L[n / 2]
@@ -20,13 +53,29 @@ def mode(X):
     if n == 0:
         return []
 
+    if _is_vector(X):
+        keys, first, counts = np.unique(X, return_index=True, return_counts=True)
+        # fill the dict in first appearance order, with the first occurrence
+        # of each value as its key, as the loop below would
+        d = {}
+        for i in np.argsort(first, kind="mergesort"):
+            d[X[first[i]]] = counts[i].item()
+        return mode_of_counts(d)
+
     d = {}
     for item in X:
         if d.has_key(item):
             d[item] += 1
         else:
             d[item] = 1
+    return mode_of_counts(d)
 
+'''
+arg: a dict mapping each value to the number of times it occurs
+return: the most frequent values, as mode() would return them for the
+    values the dict was built from
+'''
+def mode_of_counts(d):
     m = (0, 0)
     for key in d.keys():
         if d[key] > m[1]:
@@ -1,6 +1,6 @@
 from comp61542 import app
 from database import database
-from flask import (render_template, request)
+from flask import (Response, abort, render_template, request, stream_with_context)
 
 def format_data(data):
     fmt = "%.2f"
@@ -12,47 +12,52 @@ def format_data(data):
             result.append((fmt % item).rstrip('0').rstrip('.'))
     return result
 
+def stream_template(template_name, **context):
+    # render_template, but yielding the page in chunks as it is rendered
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(100)
+    return Response(stream_with_context(stream))
+
+def table_args(columns):
+    # sorting and paging arguments shared by the large table views of that
+    # many columns, checked here as the rows are only made once the page
+    # is being streamed
+    args = {"sort":None, "reverse":False, "offset":0, "limit":None}
+    if "sort" in request.args:
+        args["sort"] = int(request.args.get("sort"))
+    if "reverse" in request.args:
+        args["reverse"] = request.args.get("reverse") == "1"
+    if "offset" in request.args:
+        args["offset"] = int(request.args.get("offset"))
+    if "limit" in request.args:
+        args["limit"] = int(request.args.get("limit"))
+    if ((args["sort"] != None and not 0 <= args["sort"] < columns)
+            or args["offset"] < 0 or (args["limit"] != None and args["limit"] < 0)):
+        abort(400)
+    return args
+
+def approximate():
+    # ?approximate=1 estimates the distinct author counts, see
+    # Database.get_publication_summary
+    return request.args.get("approximate") == "1"
+
 @app.route("/averages")
 def showAverages():
     dataset = app.config['DATASET']
     db = app.config['DATABASE']
     args = {"dataset":dataset, "id":"averages"}
     args['title'] = "Averaged Data"
-    tables = []
     headers = ["Average", "Conference Paper", "Journal", "Book", "Book Chapter", "All Publications"]
-    averages = [ database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE ]
-    tables.append({
-        "id":1,
-        "title":"Average Authors per Publication",
-        "header":headers,
-        "rows":[
-                [ database.Stat.STR[i] ]
-                + format_data(db.get_average_authors_per_publication(i)[1])
-                for i in averages ] })
-    tables.append({
-        "id":2,
-        "title":"Average Publications per Author",
-        "header":headers,
-        "rows":[
-                [ database.Stat.STR[i] ]
-                + format_data(db.get_average_publications_per_author(i)[1])
-                for i in averages ] })
-    tables.append({
-        "id":3,
-        "title":"Average Publications in a Year",
-        "header":headers,
-        "rows":[
-                [ database.Stat.STR[i] ]
-                + format_data(db.get_average_publications_in_a_year(i)[1])
-                for i in averages ] })
-    tables.append({
-        "id":4,
-        "title":"Average Authors in a Year",
-        "header":headers,
-        "rows":[
-                [ database.Stat.STR[i] ]
-                + format_data(db.get_average_authors_in_a_year(i)[1])
-                for i in averages ] })
+    # every table comes from one pass over the data
+    _, summary = db.get_averages_summary()
+    tables = []
+    for i, (title, rows) in enumerate(summary):
+        tables.append({
+            "id":i + 1,
+            "title":title,
+            "header":headers,
+            "rows":[ row[:1] + format_data(row[1:]) for row in rows ] })
 
     args['tables'] = tables
     return render_template("averages.html", args=args)
@@ -77,7 +82,9 @@ def showCoAuthors():
     if "pub_type" in request.args:
         pub_type = int(request.args.get("pub_type"))
 
-    args["data"] = db.get_coauthor_data(start_year, end_year, pub_type)
+    args["data"] = (database.COAUTHOR_HEADER,
+        db.iter_coauthor_data(start_year, end_year, pub_type,
+            **table_args(len(database.COAUTHOR_HEADER))))
     args["start_year"] = start_year
     args["end_year"] = end_year
     args["pub_type"] = pub_type
@@ -86,7 +93,7 @@ def showCoAuthors():
     args["start_year"] = start_year
     args["end_year"] = end_year
     args["pub_str"] = PUB_TYPES[pub_type]
-    return render_template("coauthors.html", args=args)
+    return stream_template("coauthors.html", args=args)
 
 @app.route("/")
 def showStatisticsMenu():
@@ -103,12 +110,14 @@ def showPublicationSummary(status):
     if (status == "publication_summary"):
         args["description"] = "This shows the summary of the total number of authors per publication type and also the total number of publications per publication type"
         args["title"] = "Publication Summary"
-        args["data"] = db.get_publication_summary()
+        args["data"] = db.get_publication_summary(approximate=approximate())
 
     if (status == "publication_author"):
         args["description"] = "This shows the total number for each publication type of an author and also the overall total number of publications"
         args["title"] = "Author Publication"
-        args["data"] = db.get_publications_by_author()
+        args["data"] = (database.PUBLICATIONS_BY_AUTHOR_HEADER,
+            db.iter_publications_by_author(
+                **table_args(len(database.PUBLICATIONS_BY_AUTHOR_HEADER))))
 
     if (status == "publication_year"):
         args["description"] = "This shows the total number per publication type for each year"
@@ -118,9 +127,9 @@ def showPublicationSummary(status):
     if (status == "author_year"):
         args["description"] = "This shows the total number of authors per publication type for each year"
         args["title"] = "Author by Year"
-        args["data"] = db.get_author_totals_by_year()
+        args["data"] = db.get_author_totals_by_year(approximate=approximate())
 
-    return render_template("statistics_details.html", args=args)
+    return stream_template("statistics_details.html", args=args)
 
 
 @app.route("/author/<name>")
@@ -130,21 +139,64 @@ def showAuthors(name=None):
     args = {"dataset":dataset ,"id":name}
     
     args["name"]= name
+    if name not in db.author_idx:
+        # suggest the authors the name could have meant
+        args["query"] = name
+        args["matches"] = db.search_authors(name, search_limit())
+        return render_template('author.html', args=args), 404
     args['stats'] = db.get_publications_by_author_name(name)
-    coauthors = db.get_coauthor_details(name)
-    args['total_coauthors'] = len(coauthors) - 1
-     
-    for auth in coauthors:
-        if auth[0] == name:
-            coauthors.remove(auth)
-            args['coauthors'] = coauthors
-            break
+    args['total_coauthors'] = db.get_coauthor_count(name)
     args['detailed_stats'] = db.get_detailed_publications_by_author_name(name)
     
     return render_template('author.html', args=args)
 
+def search_limit():
+    # the number of matches listed by the author search, ?k=
+    if "k" in request.args:
+        return int(request.args.get("k"))
+    return 10
+
+def top_args():
+    # size and filters of the top k tables,
+    # ?k=&pub_type=&start_year=&end_year=
+    args = {"k":10, "pub_type":4, "start_year":None, "end_year":None}
+    for name in args:
+        if name in request.args:
+            args[name] = int(request.args.get(name))
+    if not 0 <= args["pub_type"] <= 4:
+        abort(400)
+    return args
+
+@app.route("/topauthors")
+def showTopAuthors():
+    dataset = app.config['DATASET']
+    db = app.config['DATABASE']
+    args = {"dataset":dataset, "id":"top_authors"}
+    args["title"] = "Top Authors"
+    args["description"] = "This shows the authors with the most publications"
+    args["data"] = db.get_top_authors(**top_args())
+    return render_template("statistics_details.html", args=args)
+
+@app.route("/topcoauthors/<name>")
+def showTopCoAuthors(name):
+    dataset = app.config['DATASET']
+    db = app.config['DATABASE']
+    if name not in db.author_idx:
+        args = {"dataset":dataset, "id":name, "name":name, "query":name}
+        args["matches"] = db.search_authors(name, search_limit())
+        return render_template('author.html', args=args), 404
+    args = {"dataset":dataset, "id":"top_coauthors"}
+    args["title"] = "Top Co-Authors of " + name
+    args["description"] = "This shows the co-authors " + name + " has the most publications with"
+    args["data"] = db.get_top_coauthors(name, **top_args())
+    return render_template("statistics_details.html", args=args)
+
 @app.route("/author")
 def showAuthorsSearch():
     dataset = app.config['DATASET']
+    db = app.config['DATABASE']
     args = {"dataset":dataset}
+    if "q" in request.args:
+        args["query"] = request.args.get("q")
+        args["matches"] = db.search_authors(args["query"], search_limit())
     return render_template('author.html', args=args )
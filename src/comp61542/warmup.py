@@ -0,0 +1,70 @@
+'''
+Precomputation of the expensive Database reports after the data is
+loaded, so that the first requests for the heaviest pages find their
+results in the query cache instead of computing them.
+
+WarmUp runs the reports in priority order, on a background thread with
+start() or in the calling thread with run(). A request that needs a
+result while it is being computed waits for that computation rather than
+starting another (see database.cache). Progress is served at /api/warmup.
+'''
+import threading
+import time
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# (name, function of the database) in the order they are computed; the
+# table pages only need the first row to fill the cache their rows come from
+REPORTS = [
+    ("averages", lambda db: db.get_averages_summary()),
+    ("publication_author", lambda db: list(db.iter_publications_by_author(limit=1))),
+    ("publication_summary", lambda db: db.get_publication_summary()),
+    ("coauthors", lambda db: list(db.iter_coauthor_data(db.min_year, db.max_year, 4, limit=1))),
+    ("publication_year", lambda db: db.get_publications_by_year()),
+    ("author_year", lambda db: db.get_author_totals_by_year()) ]
+
+class WarmUp:
+    def __init__(self, db, reports=REPORTS):
+        self.db = db
+        self.reports = reports
+        self.lock = threading.Lock()
+        self.progress = [ {"name":name, "state":PENDING, "seconds":None}
+            for name, _ in reports ]
+        self.thread = None
+
+    def run(self):
+        for (name, report), progress in zip(self.reports, self.progress):
+            with self.lock:
+                progress["state"] = RUNNING
+            start = time.time()
+            state = DONE
+            try:
+                report(self.db)
+            except Exception as e:
+                print "Warm-up of %s failed: %s" % (name, e)
+                state = FAILED
+            with self.lock:
+                progress["state"] = state
+                progress["seconds"] = time.time() - start
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="warm-up")
+        # a running warm-up does not keep the server from exiting
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    '''
+    return: a dict with "done", whether every report has been computed,
+        "completed" and "total", the number of reports computed so far and
+        in all, and "reports", the name, state and seconds taken of each
+    '''
+    def status(self):
+        with self.lock:
+            reports = [ dict(progress) for progress in self.progress ]
+        completed = len([ r for r in reports if r["state"] in (DONE, FAILED) ])
+        return {"done":completed == len(reports), "completed":completed,
+                "total":len(reports), "reports":reports}
@@ -1,4 +1,4 @@
-from comp61542 import app
+from comp61542 import (app, instrument, warmup)
 from comp61542.database import (database, mock_database)
 import sys
 import os
@@ -11,8 +11,11 @@ else:
     path, dataset = os.path.split(data_file)
     print "Database: path=%s name=%s" % (path, dataset)
     db = database.Database()
-    if db.read(data_file) == False:
+    # parses the XML only when there is no up to date snapshot next to it
+    if db.read_cached(data_file) == False:
         sys.exit(1)
+    # lets the author pages look their numbers up instead of counting
+    db.build_author_summary()
 
 app.config['DATASET'] = dataset
 app.config['DATABASE'] = db
@@ -23,6 +26,17 @@ if "DEBUG" in os.environ:
 if "TESTING" in os.environ:
     app.config['TESTING'] = True
 
+if "METRICS" in os.environ:
+    # timings at /debug/metrics, cProfile stats of ?profile requests
+    instrument.enable(app, os.environ.get("PROFILE_DIR"))
+
 # WARNING remove this line before commit
 app.config['DEBUG'] = True
+
+# precompute the expensive reports while serving, progress at /api/warmup;
+# with the debug reloader only in its child process, which is the one serving
+serving = not app.config['DEBUG'] or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+if dataset != "Mock" and serving:
+    app.config['WARMUP'] = warmup.WarmUp(db).start()
+
 app.run(host='0.0.0.0', port=9292)
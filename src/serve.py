@@ -0,0 +1,216 @@
+'''
+Production entry point. The database is loaded once, in the master
+process, which then forks the worker processes that serve requests.
+
+The listening socket is opened before forking, so all workers accept on
+the same port, and they share the loaded data copy-on-write. Data loaded
+from a snapshot is memory mapped, so its arrays are shared through the
+page cache as well and never copied into the workers.
+
+usage: python src/serve.py <data file> [workers] [port] [updates dir]
+
+The DBLP update files (*.xml) in updates dir are appended to the data in
+name order, and the result is saved as a second snapshot next to the data
+file, so the next start does not append them again. On SIGHUP only the
+update files not appended yet (new or changed ones) are appended, and the
+new data is swapped in without dropping requests: new workers are forked
+with it while the old ones finish the requests they are serving and
+exit. The master does not serve requests itself, so it appends to its
+own copy of the data in place; the workers keep theirs.
+
+Set METRICS to serve timings at /debug/metrics (see comp61542.instrument)
+and PROFILE_DIR to also save cProfile stats of requests made with a
+"profile" query argument.
+
+With 0 workers the master serves the requests itself, one thread per
+request. Use src/main.py for the development server.
+'''
+import errno
+import glob
+import os
+from os import path
+import signal
+import sys
+import threading
+
+from werkzeug.serving import make_server
+
+from comp61542 import (app, instrument, warmup)
+from comp61542.database import database
+
+# how long a retiring worker waits for the requests it is serving
+REQUEST_TIMEOUT = 60
+
+def updated_snapshot(data_file):
+    return data_file + ".updated.snapshot"
+
+def unchanged(update):
+    try:
+        return database.file_stat(update[0]) == update
+    except OSError:
+        return False
+
+def load(data_file, updates_dir=None):
+    db = database.Database()
+    # the data with the updates appended so far, as long as none of them
+    # changed since; otherwise the data file alone, parsed only when there
+    # is no up to date snapshot next to it
+    if (updates_dir == None or not db.load_snapshot(updated_snapshot(data_file), data_file)
+            or not all(unchanged(u) for u in db.updates)):
+        if db.read_cached(data_file) == False:
+            return None
+    db.build_author_summary()
+    if updates_dir != None and update(db, data_file, updates_dir) == False:
+        return None
+    return db
+
+'''
+Appends the update files in updates_dir that db does not hold yet, then
+saves a snapshot of the result.
+return: None if there was none, False if one could not be read. The
+    updates read before it stay appended, and so do the records read from
+    it before the error; they are skipped when it is appended again.
+'''
+def update(db, data_file, updates_dir):
+    applied = set(db.updates)
+    appended = None
+    for update in sorted(glob.glob(path.join(updates_dir, "*.xml"))):
+        if database.file_stat(update) in applied:
+            continue
+        before = len(db.publications)
+        appended = db.append(update)
+        print "%s: %d new publications" % (update, len(db.publications) - before)
+        if appended == False:
+            break
+    if appended != None:
+        try:
+            db.save_snapshot(updated_snapshot(data_file), data_file)
+        except (IOError, OSError) as e:
+            print "Warning: could not write snapshot (%s)" % e
+    return appended
+
+def install(db):
+    # results computed here before forking are cached in every worker
+    warm_up = warmup.WarmUp(db)
+    warm_up.run()
+    # requests already being served keep the database they started with
+    app.config['WARMUP'] = warm_up
+    app.config['DATABASE'] = db
+
+def spawn(server):
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # SIGUSR1 retires the worker: it stops accepting requests and exits
+        # once those it is serving are done
+        signal.signal(signal.SIGUSR1,
+            lambda signum, frame: threading.Thread(target=server.shutdown).start())
+        try:
+            server.serve_forever()
+            for t in threading.enumerate():
+                if t is not threading.current_thread():
+                    t.join(REQUEST_TIMEOUT)
+        finally:
+            os._exit(0)
+    return pid
+
+def supervise(server, workers, reload):
+    children = set(spawn(server) for _ in range(workers))
+    signals = []
+    def handle(signum, frame):
+        signals.append(signum)
+    for signum in [signal.SIGTERM, signal.SIGINT, signal.SIGHUP]:
+        signal.signal(signum, handle)
+
+    while True:
+        while signals:
+            signum = signals.pop(0)
+            if signum != signal.SIGHUP:
+                for pid in children:
+                    os.kill(pid, signal.SIGTERM)
+                for pid in children:
+                    os.waitpid(pid, 0)
+                return
+            if reload():
+                retiring = children
+                children = set(spawn(server) for _ in range(workers))
+                for pid in retiring:
+                    os.kill(pid, signal.SIGUSR1)
+        try:
+            pid, _ = os.wait()
+        except OSError as e:
+            if e.errno != errno.EINTR:
+                raise
+            continue
+        if pid in children:
+            children.discard(pid)
+            print "Worker %d exited, starting a new one" % pid
+            children.add(spawn(server))
+
+def main(argv):
+    if len(argv) < 2:
+        print __doc__
+        return 2
+    data_file = argv[1]
+    workers = 4
+    if len(argv) > 2:
+        workers = int(argv[2])
+    port = 9292
+    if len(argv) > 3:
+        port = int(argv[3])
+    updates_dir = None
+    if len(argv) > 4:
+        updates_dir = argv[4]
+
+    _, dataset = path.split(data_file)
+    db = load(data_file, updates_dir)
+    if db == None:
+        return 1
+    app.config['DATASET'] = dataset
+    if "METRICS" in os.environ:
+        instrument.enable(app, os.environ.get("PROFILE_DIR"))
+    install(db)
+
+    def reload():
+        print "Reloading %s" % dataset
+        if updates_dir == None:
+            print "No updates dir, serving the data loaded before"
+            return False
+        if workers == 0:
+            # the master serves from db, so the updates go to a new copy
+            # loaded from the snapshot update saved
+            new_db = load(data_file, updates_dir)
+            if new_db == None:
+                print "Reloading failed, serving the data loaded before"
+                return False
+            install(new_db)
+            return True
+        appended = update(db, data_file, updates_dir)
+        if appended == None:
+            print "No new updates"
+            return False
+        if appended == False:
+            print "Reloading stopped at an update that could not be read"
+        install(db)
+        return True
+
+    server = make_server("0.0.0.0", port, app, threaded=True)
+    print "Serving %s on port %d with %d workers" % (dataset, port, workers)
+    try:
+        if workers == 0:
+            # the new data is loaded next to the old, which keeps serving
+            signal.signal(signal.SIGHUP,
+                lambda signum, frame: threading.Thread(target=reload).start())
+            server.serve_forever()
+        else:
+            supervise(server, workers, reload)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,48 @@
+import unittest
+
+from comp61542.statistics import (accumulator, average)
+
+class TestAccumulator(unittest.TestCase):
+
+    def setUp(self):
+        self.datasets = [ [], [1], [1, 2], [1, 2, 2, 3], [3, 3, 1, 1],
+            [2, 2, 1, 1, 3, 3], [5, 1, 4, 1, 5, 9, 2, 6], [0, 0, 33, 33, 1] ]
+
+    def accumulate(self, cls, X):
+        acc = cls()
+        acc.push_all(X)
+        return acc
+
+    def test_mean_matches_average(self):
+        for X in self.datasets:
+            self.assertEqual(self.accumulate(accumulator.MeanAccumulator, X).finalize(),
+                average.mean(X))
+
+    def test_median_matches_average(self):
+        for X in self.datasets:
+            self.assertEqual(self.accumulate(accumulator.MedianAccumulator, X).finalize(),
+                average.median(X))
+
+    def test_mode_matches_average(self):
+        for X in self.datasets:
+            self.assertEqual(self.accumulate(accumulator.ModeAccumulator, X).finalize(),
+                average.mode(X))
+
+    def test_push_with_count(self):
+        acc = accumulator.MedianAccumulator()
+        acc.push(1, 3)
+        acc.push(4)
+        self.assertEqual(acc.finalize(), average.median([1, 1, 1, 4]))
+
+    def test_merged_shards_match_concatenated_data(self):
+        for cls, func in [(accumulator.MeanAccumulator, average.mean),
+                          (accumulator.MedianAccumulator, average.median),
+                          (accumulator.ModeAccumulator, average.mode)]:
+            for X in self.datasets:
+                for cut in range(len(X) + 1):
+                    acc = self.accumulate(cls, X[:cut])
+                    acc.merge(self.accumulate(cls, X[cut:]))
+                    self.assertEqual(acc.finalize(), func(X))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 from os import path
 import unittest
 import comp61542
+from comp61542.database import database
+import gzip
+import json
+from StringIO import StringIO
 
 class TestApp(unittest.TestCase):
 
@@ -9,12 +13,109 @@ class TestApp(unittest.TestCase):
         data = "dblp_curated_sample.xml"
         comp61542.app.config['TESTING'] = True
         comp61542.app.config['DATASET'] = data
-        comp61542.app.config['DATABASE'] = path.join(dir, "..", "data", data)
+        db = database.Database()
+        db.read(path.join(dir, "..", "data", data))
+        comp61542.app.config['DATABASE'] = db
         self.app = comp61542.app.test_client()
 
     def test_home(self):
         r = self.app.get("/")
         self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
 
+    def test_publication_author_is_paged(self):
+        r = self.app.get("/statisticsdetails/publication_author?sort=6&reverse=1&limit=2")
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        self.assertEqual(r.data.count("<a href='/author/"), 2)
+        self.assertTrue("Stefano Ceri" in r.data)
+
+    def test_coauthors(self):
+        r = self.app.get("/coauthors?start_year=2000&end_year=2005&pub_type=1&offset=1&limit=5")
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        self.assertEqual(r.data.count("<tr>"), 2 + 5)
+
+    def test_bad_table_args(self):
+        for url in ["/statisticsdetails/publication_author?sort=7",
+                "/statisticsdetails/publication_author?offset=-1",
+                "/statisticsdetails/publication_author?limit=-1",
+                "/api/statisticsdetails/publication_author?sort=9",
+                "/coauthors?sort=2", "/api/coauthors?sort=-1"]:
+            self.assertEqual(400, self.app.get(url).status_code, url)
+
+    def test_api_averages(self):
+        r = self.app.get("/api/averages")
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        data = json.loads(r.data)
+        self.assertEqual(len(data["tables"]), 4)
+        self.assertEqual([ row[0] for row in data["tables"][0]["rows"] ],
+            ["Mean", "Median", "Mode"])
+
+    def test_api_etag(self):
+        r = self.app.get("/api/statisticsdetails/publication_summary")
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        tag = r.headers["ETag"]
+        r = self.app.get("/api/statisticsdetails/publication_summary",
+            headers={"If-None-Match":tag})
+        self.assertEqual(304, r.status_code)
+        comp61542.app.config['DATABASE'].add_publication(
+            database.Publication.JOURNAL, "title", 2000, ["Author"])
+        r = self.app.get("/api/statisticsdetails/publication_summary",
+            headers={"If-None-Match":tag})
+        self.assertEqual(200, r.status_code)
+
+    def test_api_etag_changes_with_data(self):
+        # as after a restart on other data: the same name and generation
+        tags = []
+        for data in ["sprint_2_fls_stats.xml", "simple.xml"]:
+            db = database.Database()
+            db.read(path.join(path.dirname(__file__), "..", "data", data))
+            db.generation = 1
+            comp61542.app.config['DATABASE'] = db
+            tags.append(self.app.get("/api/statisticsdetails/publication_year").headers["ETag"])
+        self.assertNotEqual(tags[0], tags[1])
+
+    def test_api_gzip(self):
+        r = self.app.get("/api/statisticsdetails/publication_author",
+            headers={"Accept-Encoding":"gzip"})
+        self.assertEqual(r.headers["Content-Encoding"], "gzip")
+        data = json.loads(gzip.GzipFile(fileobj=StringIO(r.data)).read())
+        self.assertEqual(len(data["header"]), 7)
+        self.assertEqual(len(data["rows"]), len(comp61542.app.config['DATABASE'].authors))
+
+    def test_api_author(self):
+        r = self.app.get("/api/author/Stefano Ceri")
+        self.assertEqual(200, r.status_code, "Status code was not 'OK'.")
+        data = json.loads(r.data)
+        self.assertEqual(data["stats"][4], 218)
+        self.assertEqual(data["total_coauthors"], len(data["coauthors"]))
+        self.assertEqual(404, self.app.get("/api/author/Nobody").status_code)
+
+    def test_author_search(self):
+        data = json.loads(self.app.get("/api/author?q=stefano%20ce&k=3").data)
+        self.assertEqual(data["matches"], ["Stefano Ceri"])
+        r = self.app.get("/author?q=ceri")
+        self.assertEqual(200, r.status_code)
+        self.assertTrue("/author/Stefano%20Ceri" in r.data)
+        # an unknown name suggests the authors it could have meant
+        r = self.app.get("/author/Stefano")
+        self.assertEqual(404, r.status_code)
+        self.assertTrue("/author/Stefano%20Ceri" in r.data)
+
+    def test_top_authors_and_coauthors(self):
+        data = json.loads(self.app.get("/api/topauthors?k=2").data)
+        self.assertEqual(data["rows"], [["Stefano Ceri", 218], ["Carole A. Goble", 199]])
+        data = json.loads(self.app.get("/api/topcoauthors/Stefano%20Ceri?k=1&pub_type=1&start_year=2000").data)
+        self.assertEqual(data["rows"], [["Piero Fraternali", 10]])
+        r = self.app.get("/topauthors?k=3&end_year=2005")
+        self.assertEqual(200, r.status_code)
+        self.assertEqual(r.data.count("<a href='/author/"), 3)
+        r = self.app.get("/topcoauthors/Stefano%20Ceri")
+        self.assertEqual(200, r.status_code)
+        self.assertTrue("/author/Piero Fraternali" in r.data)
+        self.assertEqual(404, self.app.get("/topcoauthors/Stefano").status_code)
+        self.assertEqual(404, self.app.get("/api/topcoauthors/Stefano").status_code)
+        for url in ["/topauthors?pub_type=5", "/api/topauthors?pub_type=9",
+                "/api/topcoauthors/Stefano%20Ceri?pub_type=-1"]:
+            self.assertEqual(400, self.app.get(url).status_code, url)
+
 if __name__ == '__main__':
     unittest.main()
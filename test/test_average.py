@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 
 from comp61542.statistics import average
 
@@ -49,5 +50,20 @@ class TestAverage(unittest.TestCase):
     def test_mode_is_sorted_for_multiple_values(self):
         self.assertEqual(average.mode([2, 2, 1, 1]), [1, 2])
 
+    def test_array_results_match_list_results(self):
+        for X in [ [1.0, 2.0, 2.0, 3.0], [2, 2, 1, 1], [0.0, 0.0, 3.0, 1.0, 3.0],
+                   [0.5, 0.25, 0.125], [1, 2, 3, 4, 5, 6, 7] ]:
+            for func in [average.mean, average.median, average.mode]:
+                fast = func(np.array(X))
+                average.FAST_PATHS = False
+                try:
+                    slow = func(np.array(X))
+                finally:
+                    average.FAST_PATHS = True
+                self.assertEqual(repr(fast), repr(slow))
+
+    def test_mode_keeps_first_appearance_order_for_arrays(self):
+        self.assertEqual(average.mode(np.array([33, 33, 1, 1])), average.mode([33, 33, 1, 1]))
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,6 @@
 from os import path
+import shutil
+import tempfile
 import unittest
 
 from comp61542.database import database
@@ -17,6 +19,7 @@ class TestDatabase(unittest.TestCase):
     def test_read_invalid_xml(self):
         db = database.Database()
         self.assertFalse(db.read(path.join(self.data_dir, "invalid_xml_file.xml")))
+        self.assertFalse(db.read(path.join(self.data_dir, "invalid_xml_file.xml"), use_sax=True))
 
     def test_read_missing_year(self):
         db = database.Database()
@@ -250,6 +253,364 @@ class TestDatabase(unittest.TestCase):
             stats = db.get_detailed_publications_by_author_name(author)
             expected = expected_results.get(author) if expected_results.get(author) != None else [[0, 0, 0, 0, 0] for i in range(0, 3)]
             self.assertEqual(stats, expected, 'Incorrect stats for {}: {}. Expected {}'.format(author, stats, expected))
+
+    def test_author_publication_index(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "three-authors-and-three-publications.xml")))
+        self.assertEqual(db.author_pubs[db.author_idx["author1"]], [0, 1])
+        self.assertEqual(db.author_pubs[db.author_idx["author2"]], [1])
+        # an author listed twice on one publication is indexed once
+        db.add_publication(database.Publication.JOURNAL, "title", 9999,
+            ["author2", "author2"])
+        self.assertEqual(db.author_pubs[db.author_idx["author2"]], [1, 3])
+        self.assertEqual(db.get_publications_by_author_name("author2"), [1, 1, 0, 0, 2])
+        self.assertEqual(db.get_publications_by_author_name("nobody"), [0, 0, 0, 0, 0])
+
+    def test_get_network_data(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "three-authors-and-three-publications.xml")))
+        nodes, links = db.get_network_data()
+        self.assertEqual(nodes, [["author1", 1], ["author2", 1], ["author3", 0]])
+        self.assertEqual(links, set([(0, 1)]))
+
+    def test_columnar_storage_matches_list_storage(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "sprint_2_fls_stats.xml")))
+        cdb = database.Database(columnar=True)
+        self.assertTrue(cdb.read(path.join(self.data_dir, "sprint_2_fls_stats.xml")))
+        self.assertEqual(len(cdb.publications), len(db.publications))
+        for p, cp in zip(db.publications, cdb.publications):
+            self.assertEqual((cp.pub_type, cp.title, cp.year, cp.authors),
+                (p.pub_type, p.title, p.year, p.authors))
+        self.assertEqual(cdb.publications[-1].title, db.publications[-1].title)
+        self.assertEqual(cdb.get_publication_summary(), db.get_publication_summary())
+        for author in db.get_all_authors():
+            self.assertEqual(cdb.get_detailed_publications_by_author_name(author),
+                db.get_detailed_publications_by_author_name(author))
+
+    def test_averages_match_for_columnar_storage(self):
+        for i in range(1, 5):
+            data_file = path.join(self.data_dir, "sprint-2-acceptance-%d.xml" % i)
+            db = database.Database()
+            self.assertTrue(db.read(data_file))
+            cdb = database.Database(columnar=True)
+            self.assertTrue(cdb.read(data_file))
+            for av in [database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE]:
+                self.assertEqual(cdb.get_average_publications_per_author(av),
+                    db.get_average_publications_per_author(av))
+                self.assertEqual(cdb.get_average_publications_in_a_year(av),
+                    db.get_average_publications_in_a_year(av))
+                self.assertEqual(cdb.get_average_authors_in_a_year(av),
+                    db.get_average_authors_in_a_year(av))
+                self.assertEqual(cdb.get_publication_summary_average(av),
+                    db.get_publication_summary_average(av))
+
+    def test_snapshot_round_trip(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            data_file = path.join(tmp_dir, "data.xml")
+            shutil.copy(path.join(self.data_dir, "sprint_2_fls_stats.xml"), data_file)
+            snapshot_dir = path.join(tmp_dir, "data.snapshot")
+
+            db = database.Database()
+            self.assertTrue(db.read(data_file))
+            self.assertFalse(database.Database().load_snapshot(snapshot_dir, data_file))
+            db.save_snapshot(snapshot_dir, data_file)
+
+            sdb = database.Database()
+            self.assertTrue(sdb.load_snapshot(snapshot_dir, data_file))
+            self.assertEqual(sdb.author_idx, db.author_idx)
+            self.assertEqual(sdb.author_pubs, db.author_pubs)
+            self.assertEqual((sdb.min_year, sdb.max_year), (db.min_year, db.max_year))
+            self.assertEqual([ p.title for p in sdb.publications ],
+                [ p.title for p in db.publications ])
+            self.assertEqual(sdb.get_publications_by_author(), db.get_publications_by_author())
+            self.assertEqual(sdb.data_version(), db.data_version())
+
+            # publications can still be added to a loaded snapshot
+            sdb.add_publication(database.Publication.JOURNAL, None, 2015, ["Author C"])
+            self.assertEqual(sdb.publications[-1].title, None)
+            self.assertEqual(sdb.get_publications_by_author_name("Author C"), [0, 1, 0, 0, 1])
+            self.assertNotEqual(sdb.data_version(), db.data_version())
+
+            # a modified source file makes the snapshot stale
+            with open(data_file, "a") as f:
+                f.write("\n")
+            self.assertFalse(database.Database().load_snapshot(snapshot_dir, data_file))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_expat_and_sax_parsers_agree(self):
+        for data_file in ["dtd_entities.xml", "sprint_2_fls_stats.xml",
+                          "dblp_curated_sample.xml"]:
+            db = database.Database()
+            self.assertTrue(db.read(path.join(self.data_dir, data_file)))
+            sdb = database.Database()
+            self.assertTrue(sdb.read(path.join(self.data_dir, data_file), use_sax=True))
+            self.assertEqual(db.author_idx, sdb.author_idx)
+            self.assertEqual([ (p.pub_type, p.title, p.year, p.authors) for p in db.publications ],
+                [ (p.pub_type, p.title, p.year, p.authors) for p in sdb.publications ])
+
+    def test_read_resolves_dtd_entities(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dtd_entities.xml")))
+        self.assertEqual(len(db.publications), 2)
+        self.assertEqual(db.authors[0].name, u"J\xfcrgen M\xfcller")
+        self.assertEqual(db.publications[0].title, "Subscript and italic titles")
+
+    def test_parallel_read_matches_sequential_read(self):
+        # the last is read sequentially: its first record starts on the
+        # line of <dblp>, so it cannot be split into shards
+        for data_file in ["dblp_curated_sample.xml", "dtd_entities.xml",
+                "publications_small_sample_update.xml", "single_line_start.xml"]:
+            db = database.Database()
+            self.assertTrue(db.read(path.join(self.data_dir, data_file)))
+            pdb = database.Database()
+            self.assertTrue(pdb.read(path.join(self.data_dir, data_file), processes=3))
+            self.assertEqual(pdb.author_idx, db.author_idx)
+            self.assertEqual(pdb.author_pubs, db.author_pubs)
+            self.assertEqual(pdb.year_type_pubs, db.year_type_pubs)
+            self.assertEqual(pdb.pub_keys.hashes().tolist(), db.pub_keys.hashes().tolist())
+            self.assertEqual((pdb.min_year, pdb.max_year), (db.min_year, db.max_year))
+            self.assertEqual([ (p.pub_type, p.title, p.year, p.authors) for p in pdb.publications ],
+                [ (p.pub_type, p.title, p.year, p.authors) for p in db.publications ])
+        pdb = database.Database()
+        self.assertFalse(pdb.read(path.join(self.data_dir, "invalid_xml_file.xml"), processes=3))
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            empty_file = path.join(tmp_dir, "empty.xml")
+            open(empty_file, "w").close()
+            db = database.Database()
+            pdb = database.Database()
+            self.assertEqual(pdb.read(empty_file, processes=3), db.read(empty_file))
+            self.assertEqual(len(pdb.publications), 0)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_query_results_are_cached_until_publication_added(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "simple.xml")))
+        summary = db.get_publication_summary()
+        self.assertTrue(db.get_publication_summary() is summary)
+        db.get_average_authors_per_publication(database.Stat.MEAN)
+        db.get_average_authors_per_publication(database.Stat.MEDIAN)
+        stats = db.cache.stats()
+        # the first average also caches the intermediate results both share
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (2, 6, 6))
+
+        db.add_publication(database.Publication.JOURNAL, "title", 9999, ["AUTHOR3"])
+        _, data = db.get_publication_summary()
+        self.assertEqual(data[0][2], 1)
+        self.assertEqual(db.cache.stats()["entries"], 1)
+
+    def test_averages_summary_matches_single_averages(self):
+        for data_file in ["simple.xml", "dblp_curated_sample.xml"]:
+            db = database.Database()
+            self.assertTrue(db.read(path.join(self.data_dir, data_file)))
+            header, tables = db.get_averages_summary()
+            self.assertEqual(len(tables), 4)
+            for (_, rows), method in zip(tables, [
+                    db.get_average_authors_per_publication,
+                    db.get_average_publications_per_author,
+                    db.get_average_publications_in_a_year,
+                    db.get_average_authors_in_a_year]):
+                for row, av in zip(rows, [database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE]):
+                    self.assertEqual(row[0], database.Stat.STR[av])
+                    self.assertEqual(method(av), (header, row[1:]))
+
+    def test_approximate_author_counts_are_close(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        for query in [db.get_publication_summary, db.get_author_totals_by_year]:
+            header, data = query()
+            self.assertEqual(query(approximate=True)[0], header)
+            for row, estimate in zip(data, query(approximate=True)[1]):
+                self.assertEqual(estimate[0], row[0])
+                for count, estimated in zip(row[1:], estimate[1:]):
+                    self.assertTrue(abs(estimated - count) <= max(2, 0.05 * count))
+
+    def test_top_authors_match_sorted_counts(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        for pub_type, start_year, end_year in [(4, None, None), (1, None, None),
+                (4, 2000, 2005), (0, None, 1995)]:
+            counts = {}
+            for p in db.publications:
+                if ((pub_type == 4 or p.pub_type == pub_type) and
+                    (start_year == None or p.year >= start_year) and
+                    (end_year == None or p.year <= end_year)):
+                    for a in p.authors:
+                        counts[a] = counts.get(a, 0) + 1
+            expected = [ [db.authors[a].name, -n] for n, a in
+                sorted((-n, a) for a, n in counts.items())[:25] ]
+            header, rows = db.get_top_authors(25, pub_type, start_year, end_year)
+            self.assertEqual(rows, expected)
+        self.assertEqual(db.get_top_authors(0)[1], [])
+        self.assertEqual(len(db.get_top_authors(10 ** 6)[1]), len(db.authors))
+
+    def test_top_coauthors(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "dblp_curated_sample.xml")))
+        details = dict(db.get_coauthor_details("Stefano Ceri"))
+        del details["Stefano Ceri"]
+        expected = sorted(details.items(), key=lambda item: -item[1])[:5]
+        _, rows = db.get_top_coauthors("Stefano Ceri", 5)
+        self.assertEqual([ row[1] for row in rows ], [ n for _, n in expected ])
+        self.assertEqual(rows[0], ["Piero Fraternali", 49])
+        # ties are broken by author id
+        _, rows = db.get_top_coauthors("Stefano Ceri", 3, 1, 2000)
+        self.assertEqual(rows, [["Piero Fraternali", 10], ["Marco Brambilla", 10],
+            ["Daniele Braga", 10]])
+        self.assertEqual(db.get_top_coauthors("Stefano Ceri", 5, 2, 2014)[1], [])
+
+    def test_query_cache_evicts_least_recently_used(self):
+        db = database.Database(cache_bytes=2000)
+        self.assertTrue(db.read(path.join(self.data_dir, "simple.xml")))
+        db.get_publication_summary()
+        db.get_publications_by_year()
+        db.get_author_totals_by_year()
+        stats = db.cache.stats()
+        self.assertTrue(stats["evictions"] > 0)
+        self.assertTrue(stats["bytes"] <= 2000)
+
+        db = database.Database(cache_bytes=0)
+        self.assertTrue(db.read(path.join(self.data_dir, "simple.xml")))
+        self.assertEqual(db.get_publication_summary(), db.get_publication_summary())
+
+    def test_get_coauthor_data_by_year_range(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "three-authors-and-three-publications.xml")))
+        db.add_publication(database.Publication.JOURNAL, "title", 2000, ["author1", "author3"])
+        db.add_publication(database.Publication.BOOK, "title", 2001, ["author2", "author3"])
+        self.assertEqual(db.year_type_pubs[(2000, database.Publication.JOURNAL)], [3])
+        _, data = db.get_coauthor_data(2000, 2001, 4)
+        self.assertEqual(sorted(data), [["author1 (1)", "author3 (2)"],
+            ["author2 (1)", "author3 (2)"], ["author3 (2)", "author1 (1), author2 (1)"]])
+        _, data = db.get_coauthor_data(2001, None, database.Publication.BOOK)
+        self.assertEqual(sorted(data), [["author2 (1)", "author3 (1)"], ["author3 (1)", "author2 (1)"]])
+        _, data = db.get_coauthor_data(None, 1999, 4)
+        self.assertEqual(data, [])
+
+    def test_author_summary(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "sprint_2_fls_stats.xml")))
+        db.build_author_summary()
+        self.assertEqual(db.get_detailed_publications_by_author_name("Author A"),
+            [[2, 1, 0, 0, 3], [0, 0, 1, 1, 2], [1, 1, 0, 0, 2]])
+        self.assertEqual(db.get_publications_by_author_name("Author A"), [3, 2, 1, 1, 7])
+        self.assertEqual(db.get_coauthor_count("Author A"), 1)
+
+        # the summary follows publications added after it was built
+        db.add_publication(database.Publication.BOOK, "title", 2014,
+            ["Author A", "Author C", "Author B"])
+        self.assertEqual(db.get_detailed_publications_by_author_name("Author A"),
+            [[2, 1, 1, 0, 4], [0, 0, 1, 1, 2], [1, 1, 0, 0, 2]])
+        self.assertEqual(db.get_publications_by_author_name("Author C"), [0, 0, 1, 0, 1])
+        self.assertEqual(db.get_coauthor_count("Author A"), 2)
+        self.assertEqual(db.get_coauthor_count("Author C"), 2)
+        self.assertEqual(db.get_coauthor_count("Nobody"), 0)
+
+    def test_average_publications_per_author_by_year_sparse(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "sprint_2_fls_stats.xml")))
+        db.add_publication(database.Publication.BOOK, "title", 2014, ["Author D", "Author D"])
+        for av in [database.Stat.MEAN, database.Stat.MEDIAN, database.Stat.MODE]:
+            _, data = db.get_average_publications_per_author_by_year(av)
+            func = database.Stat.FUNC[av]
+            for row in data:
+                # the same statistics over a dense author x type count matrix
+                counts = [ [0.0] * 4 for _ in db.authors ]
+                for p in db.publications:
+                    if p.year == row[0]:
+                        for a in p.authors:
+                            counts[a][p.pub_type] += 1
+                expected = [ func([ c[i] for c in counts ]) for i in range(4) ]
+                expected.append(func([ sum(c) for c in counts ]))
+                self.assertEqual(row[1:], expected)
+
+    def test_author_names_split_once(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "simple.xml")))
+        db.add_publication(database.Publication.BOOK, "title", 2000,
+            [u"Jan van der Berg", u"Anna Berg", u"Plato"])
+        names = [ (a.name, a.first_name, a.last_name) for a in db.authors[-3:] ]
+        self.assertEqual(names, [(u"Jan van der Berg", u"Jan van der", u"Berg"),
+            (u"Anna Berg", u"Anna", u"Berg"), (u"Plato", u"", u"Plato")])
+        self.assertTrue(db.authors[-3].last_name is db.authors[-2].last_name)
+        self.assertFalse(hasattr(db.authors[-1], "__dict__"))
+
+    def test_append_skips_loaded_keys(self):
+        db = database.Database()
+        self.assertTrue(db.read(path.join(self.data_dir, "publications_small_sample.xml")))
+        db.build_author_summary()
+        n = len(db.publications)
+        self.assertTrue(db.append(path.join(self.data_dir, "publications_small_sample_update.xml")))
+        # the book is already loaded and the article is listed twice
+        self.assertEqual(len(db.publications), n + 1)
+        self.assertEqual(db.max_year, 2014)
+        self.assertEqual(db.search_authors("ada"), ["Ada Newcomer"])
+
+        full = database.Database()
+        self.assertTrue(full.read(path.join(self.data_dir, "publications_small_sample.xml")))
+        full.add_publication(database.Publication.JOURNAL, "An update record.", 2014,
+            ["Yeliz Yesilada", "Ada Newcomer"])
+        full.build_author_summary()
+        self.assertEqual(db.author_pubs, full.author_pubs)
+        self.assertEqual(db.year_type_pubs, full.year_type_pubs)
+        # the incrementally grown summary has spare rows
+        self.assertEqual(db.author_summary[:len(db.authors)].tolist(),
+            full.author_summary.tolist())
+        self.assertEqual(db.get_publications_by_author(), full.get_publications_by_author())
+
+    def test_add_to_snapshot_of_empty_database(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            data_file = path.join(tmp_dir, "data.xml")
+            with open(data_file, "w") as f:
+                f.write("<dblp></dblp>")
+            db = database.Database()
+            self.assertTrue(db.read_cached(data_file))
+            sdb = database.Database()
+            self.assertTrue(sdb.load_snapshot(data_file + ".snapshot", data_file))
+            self.assertEqual(len(sdb.publications), 0)
+            sdb.add_publication(database.Publication.JOURNAL, "title", 2000, ["AUTHOR1", "AUTHOR2"])
+            self.assertEqual(len(sdb.publications), 1)
+            self.assertEqual(sdb.publications[0].authors, [0, 1])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_append_to_snapshot(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            data_file = path.join(tmp_dir, "data.xml")
+            shutil.copy(path.join(self.data_dir, "publications_small_sample.xml"), data_file)
+            db = database.Database()
+            self.assertTrue(db.read_cached(data_file))
+
+            sdb = database.Database()
+            self.assertTrue(sdb.load_snapshot(data_file + ".snapshot", data_file))
+            self.assertEqual(len(sdb.pub_keys), len(db.publications))
+            self.assertTrue("books/aw/CeriF97" in sdb.pub_keys)
+            update = path.join(self.data_dir, "publications_small_sample_update.xml")
+            self.assertTrue(sdb.append(update))
+            self.assertEqual(len(sdb.publications), len(db.publications) + 1)
+            self.assertEqual(sdb.publications[-1].title, "An update record.")
+
+            # the same update of the same data gives the same data version
+            self.assertNotEqual(sdb.data_version(), db.data_version())
+            self.assertTrue(db.append(update))
+            self.assertEqual(sdb.data_version(), db.data_version())
+
+            # the snapshot of the appended data records the update
+            self.assertEqual(sdb.updates, [database.file_stat(update)])
+            sdb.save_snapshot(data_file + ".updated", data_file)
+            udb = database.Database()
+            self.assertTrue(udb.load_snapshot(data_file + ".updated", data_file))
+            self.assertEqual(udb.updates, sdb.updates)
+            self.assertEqual(len(udb.publications), len(sdb.publications))
+        finally:
+            shutil.rmtree(tmp_dir)
         
 if __name__ == '__main__':
     unittest.main()
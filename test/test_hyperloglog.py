@@ -0,0 +1,35 @@
+import unittest
+
+import numpy as np
+
+from comp61542.statistics.hyperloglog import HyperLogLog
+
+class TestHyperLogLog(unittest.TestCase):
+
+    def test_empty_sketch_estimates_zero(self):
+        self.assertEqual(HyperLogLog(2).estimate().tolist(), [0.0, 0.0])
+
+    def test_small_counts_are_close(self):
+        sketch = HyperLogLog(1)
+        sketch.add(np.zeros(30, dtype=np.int64), np.arange(30) % 10)
+        self.assertEqual(int(round(sketch.estimate()[0])), 10)
+
+    def test_estimates_within_error_bound(self):
+        # four standard errors of 1.04 / sqrt(4096)
+        for n in [1000, 50000, 200000]:
+            sketch = HyperLogLog(1)
+            values = np.arange(n)
+            # every value added twice
+            sketch.add(np.zeros(2 * n, dtype=np.int64), np.concatenate((values, values)))
+            self.assertTrue(abs(sketch.estimate()[0] - n) < 4 * 1.04 / 64 * n)
+
+    def test_union_matches_single_sketch(self):
+        values = np.arange(20000)
+        parts = HyperLogLog(4)
+        parts.add(values % 4, values)
+        whole = HyperLogLog(1)
+        whole.add(np.zeros(len(values), dtype=np.int64), values)
+        self.assertEqual(parts.union(4).estimate().tolist(), whole.estimate().tolist())
+
+if __name__ == '__main__':
+    unittest.main()
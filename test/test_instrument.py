@@ -0,0 +1,67 @@
+from os import path
+import os
+import shutil
+import tempfile
+import unittest
+import comp61542
+from comp61542 import instrument
+from comp61542.database import database
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self):
+        dir, _ = path.split(__file__)
+        data = "dblp_curated_sample.xml"
+        comp61542.app.config['TESTING'] = True
+        comp61542.app.config['DATASET'] = data
+        db = database.Database()
+        db.read(path.join(dir, "..", "data", data))
+        comp61542.app.config['DATABASE'] = db
+        self.profile_dir = tempfile.mkdtemp()
+        self.disable = instrument.enable(comp61542.app, self.profile_dir)
+        self.app = comp61542.app.test_client()
+
+    def tearDown(self):
+        self.disable()
+        shutil.rmtree(self.profile_dir)
+
+    def test_timed_iter_counts_one_call(self):
+        func = instrument.timed_iter("test", "numbers", lambda n: iter(range(n)))
+        self.assertEqual(list(func(3)), [0, 1, 2])
+        self.assertEqual(instrument.metrics[("test", "numbers")][0], 1)
+
+    def test_metrics(self):
+        for url in ["/coauthors?limit=5", "/author/Stefano Ceri?profile"]:
+            r = self.app.get(url)
+            self.assertEqual(200, r.status_code)
+            # requests are timed until the server has sent the page and
+            # closed the response
+            self.assertTrue(len(r.data) > 0)
+            r.close()
+        r = self.app.get("/debug/metrics")
+        self.assertEqual(200, r.status_code)
+        self.assertTrue(r.mimetype.startswith("text/plain"))
+        lines = r.data.splitlines()
+        for metric in ['comp61542_calls_total{kind="request",name="showCoAuthors"}',
+                       'comp61542_calls_total{kind="view",name="showCoAuthors"}',
+                       'comp61542_calls_total{kind="database",name="iter_coauthor_data"}',
+                       'comp61542_calls_total{kind="template",name="coauthors.html"}',
+                       'comp61542_seconds_total{kind="request",name="showAuthors"}',
+                       'comp61542_cache_misses_total']:
+            self.assertTrue(any(line.startswith(metric + " ") for line in lines), metric)
+        self.assertEqual(os.listdir(self.profile_dir), ["showAuthors-1.prof"])
+
+    def test_disable_restores_app(self):
+        self.disable()
+        self.assertFalse(isinstance(comp61542.app.wsgi_app, instrument.RequestTimer))
+        self.assertEqual(404, self.app.get("/debug/metrics").status_code)
+        # no request, view, template or query is timed any more
+        calls = dict((key, list(m)) for key, m in instrument.metrics.items())
+        self.assertEqual(200, self.app.get("/averages").status_code)
+        self.assertEqual(instrument.metrics, calls)
+        # instrumentation can be turned on again
+        self.disable = instrument.enable(comp61542.app)
+        self.assertEqual(200, self.app.get("/debug/metrics").status_code)
+
+if __name__ == '__main__':
+    unittest.main()
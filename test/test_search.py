@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from comp61542.database.search import (NameIndex, normalize)
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.names = [u"Jan van der Berg", u"Anna Berg", u"Bernd Müller",
+            u"Berta  Smith", u"Plato"]
+        self.index = NameIndex(self.names)
+
+    def search(self, query, k=10):
+        return [ self.names[i] for i in self.index.search(query, k) ]
+
+    def test_normalize(self):
+        self.assertEqual(normalize(u" Bernd  Müller "), u"bernd muller")
+        self.assertEqual(normalize("PLATO"), u"plato")
+
+    def test_full_name_matches_come_first(self):
+        self.assertEqual(self.search("ber"),
+            [u"Bernd Müller", u"Berta  Smith", u"Jan van der Berg", u"Anna Berg"])
+
+    def test_word_prefix_and_accents(self):
+        self.assertEqual(self.search("muell"), [])
+        self.assertEqual(self.search("MULL"), [u"Bernd Müller"])
+        self.assertEqual(self.search("van der b"), [u"Jan van der Berg"])
+        self.assertEqual(self.search("berta smith"), [u"Berta  Smith"])
+
+    def test_top_k(self):
+        self.assertEqual(self.search("ber", 2), [u"Bernd Müller", u"Berta  Smith"])
+        self.assertEqual(self.search("ber", 0), [])
+
+    def test_add(self):
+        self.names.append(u"Anna Bergman")
+        self.index.add(self.names[-1], len(self.names) - 1)
+        self.assertEqual(self.search("anna"), [u"Anna Berg", u"Anna Bergman"])
+
+    def test_add_many_then_merge(self):
+        for name in [u"Zoe Berg", u"Anna Adams", u"Bert Zeller"]:
+            self.names.append(name)
+            self.index.add(name, len(self.names) - 1)
+        self.index.merge()
+        self.assertEqual(self.index.full, sorted(self.index.full))
+        self.assertEqual(self.index.words, sorted(self.index.words))
+        self.assertEqual(self.search("anna"), [u"Anna Adams", u"Anna Berg"])
+        self.assertEqual(self.search("berg"), [u"Jan van der Berg", u"Anna Berg", u"Zoe Berg"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+from os import path
+import threading
+import time
+import unittest
+
+import comp61542
+from comp61542 import warmup
+from comp61542.database import database
+from comp61542.database.cache import ResultCache
+
+class TestWarmUp(unittest.TestCase):
+
+    def setUp(self):
+        dir, _ = path.split(__file__)
+        self.db = database.Database()
+        self.db.read(path.join(dir, "..", "data", "dblp_curated_sample.xml"))
+
+    def test_reports_are_cached_after_warm_up(self):
+        warm_up = warmup.WarmUp(self.db)
+        self.assertEqual(warm_up.status()["completed"], 0)
+        warm_up.start().thread.join()
+
+        status = warm_up.status()
+        self.assertTrue(status["done"])
+        self.assertEqual(status["completed"], len(warmup.REPORTS))
+        self.assertEqual([ r["state"] for r in status["reports"] ],
+            [warmup.DONE] * len(warmup.REPORTS))
+
+        misses = self.db.cache.stats()["misses"]
+        self.db.get_averages_summary()
+        list(self.db.iter_publications_by_author(sort=6))
+        self.assertEqual(self.db.cache.stats()["misses"], misses)
+
+    def test_pages_are_cached_after_warm_up(self):
+        warmup.WarmUp(self.db).run()
+        comp61542.app.config['TESTING'] = True
+        comp61542.app.config['DATASET'] = "dblp_curated_sample.xml"
+        comp61542.app.config['DATABASE'] = self.db
+        app = comp61542.app.test_client()
+        misses = self.db.cache.stats()["misses"]
+        for url in ["/averages", "/coauthors", "/statisticsdetails/publication_summary",
+                "/statisticsdetails/publication_author", "/statisticsdetails/publication_year",
+                "/statisticsdetails/author_year"]:
+            self.assertEqual(app.get(url).status_code, 200)
+            self.assertEqual(self.db.cache.stats()["misses"], misses, url)
+
+    def test_failed_report_does_not_stop_warm_up(self):
+        def fail(db):
+            raise ValueError("no data")
+        warm_up = warmup.WarmUp(self.db, [("fail", fail),
+            ("summary", lambda db: db.get_publication_summary())])
+        warm_up.run()
+        self.assertEqual([ r["state"] for r in warm_up.status()["reports"] ],
+            [warmup.FAILED, warmup.DONE])
+
+    def test_concurrent_misses_compute_once(self):
+        # too small to keep the value, so a late second call would compute again
+        cache = ResultCache(0)
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 42
+
+        results = []
+        threads = [ threading.Thread(target=lambda: results.append(cache.compute("key", 1, compute)))
+            for _ in range(3) ]
+        threads[0].start()
+        started.wait()
+        for t in threads[1:]:
+            t.start()
+        time.sleep(0.1)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [42, 42, 42])
+        self.assertEqual(cache.in_flight, {})
+
+    def test_status_endpoint(self):
+        comp61542.app.config['TESTING'] = True
+        comp61542.app.config['DATASET'] = "dblp_curated_sample.xml"
+        comp61542.app.config['DATABASE'] = self.db
+        comp61542.app.config['WARMUP'] = warmup.WarmUp(self.db)
+        try:
+            app = comp61542.app.test_client()
+            status = json.loads(app.get("/api/warmup").data)
+            self.assertFalse(status["done"])
+            self.assertEqual(status["reports"][0], {"name":"averages",
+                "state":warmup.PENDING, "seconds":None})
+
+            comp61542.app.config['WARMUP'].run()
+            status = json.loads(app.get("/api/warmup").data)
+            self.assertTrue(status["done"])
+        finally:
+            del comp61542.app.config['WARMUP']
+
+if __name__ == '__main__':
+    unittest.main()